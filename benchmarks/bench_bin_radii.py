@@ -0,0 +1,67 @@
+"""
+Compares the BinRadii scs lookups on a real material table: the default
+merge and interpolate in numpy (interp_merge), which must equal the pandas
+merge (interp_linear), against the monotone segment np.interp lookup
+(ProcLib.scs_lookup), selected with scs_lookup="monotone". Cross sections
+are sampled log uniformly over the table, plus some past each end.
+Needs the config and the material table of the instrument preset. Run with
+
+    python benchmarks/bench_bin_radii.py [-i INSTRUMENT] [-n SCS]
+"""
+
+from argparse import ArgumentParser
+import time
+
+import numpy as np
+import pandas as pd
+
+from oproc import ConfigHandler as ch
+from oproc.ConfigHandler.RunContext import RunContext
+from oproc.ProcHandler import ProcLib as pl
+from oproc.ProcHandler.ProcObjects.AddMaterial import get_ops_material_data
+from oproc.ProcHandler.ProcObjects.BinRadii import interp_linear, \
+    interp_merge
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('-i', '--instrument', default='UCASS')
+    parser.add_argument('-n', '--scs', type=int, default=30)
+    args = parser.parse_args()
+
+    ctx = RunContext.for_instrument(args.instrument)
+    ch.activate(ctx)
+    mat = get_ops_material_data(ctx)
+    scs = np.asarray(mat['mat_scs'], dtype=float)
+    rad = np.asarray(mat['mat_rad'], dtype=float)
+    lo, hi = np.nanmin(scs[scs > 0]), np.nanmax(scs)
+    q = np.concatenate([np.geomspace(lo, hi, args.scs), [hi * 1.5, hi * 3]])
+
+    t0 = time.perf_counter()
+    merged = np.asarray(interp_linear(pd.DataFrame({'mat_scs': q}),
+                                      pd.DataFrame({'mat_rad': rad,
+                                                    'mat_scs': scs}),
+                                      'mat_scs', 'mat_rad'), dtype=float)
+    t1 = time.perf_counter()
+    fast = np.asarray(interp_merge(q, scs, rad), dtype=float)
+    t2 = time.perf_counter()
+    mono = pl.scs_to_radius(q, pl.scs_lookup(scs, rad))
+    t3 = time.perf_counter()
+
+    np.testing.assert_allclose(fast, merged, rtol=1e-12, equal_nan=True,
+                               err_msg='interp_merge differs from '
+                                       'interp_linear')
+
+    assert len(merged) == len(q), 'merge lookup changed the number of bins'
+    assert len(mono) == len(q)
+    assert not np.isnan(mono).any(), 'monotone lookup gave nan'
+    assert not np.isnan(merged[-2:]).any(), 'merge lookup nan past the end'
+    assert (np.diff(mono) >= 0).all(), 'monotone lookup is not monotone'
+
+    rel = np.abs(mono - merged) / merged
+    print(pd.DataFrame({'scs': q, 'merge': merged, 'monotone': mono,
+                        'rel_diff': rel}).to_string())
+    print(f'{len(scs)} row table, {len(q)} cross sections: pandas merge '
+          f'{t1 - t0:.4f} s, numpy merge {t2 - t1:.4f} s, monotone '
+          f'{t3 - t2:.4f} s; rel diff median '
+          f'{np.nanmedian(rel):.3g}, max {np.nanmax(rel):.3g}')
@@ -0,0 +1,59 @@
+"""
+Benchmark of the matching core of Utilities.match_raw_files: the old per-file
+list of deltas with min/index against Utilities.match_nearest, on synthetic
+archives of N default-type and N match-type file datetimes. Run with
+
+    python benchmarks/bench_match_raw_files.py [-n FILES]
+"""
+
+from argparse import ArgumentParser
+import time
+
+import numpy as np
+import pandas as pd
+
+from oproc.ArchiveHandler import Utilities as utils
+
+
+def make_table(n: int, seed: int) -> pd.DataFrame:
+    """Index table of n files spread randomly over a year"""
+    rng = np.random.default_rng(seed)
+    dts = pd.Timestamp('2022-01-01') + pd.to_timedelta(
+        np.sort(rng.integers(0, 365 * 24 * 60, n)), unit='min')
+    fn = [f'X_{x:%Y%m%d_%H%M%S}00_{i}.csv' for i, x in enumerate(dts)]
+    return pd.DataFrame({'datetime': dts, 'fn': fn, 'size': 0, 'mtime': 0})
+
+
+def legacy(dt0s: list, tm: list, fdt: list, tol_min: float) -> list:
+    """The old path; a python list of deltas for each datetime"""
+    mfn = []
+    for dt0 in dt0s:
+        delta_dt = [abs((x - dt0).total_seconds() / 60.0) for x in fdt]
+        if min(delta_dt) > tol_min:
+            mfn.append(np.nan)
+        else:
+            mfn.append(tm[list(delta_dt).index(min(delta_dt))])
+    return mfn
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--files', type=int, default=10_000)
+    parser.add_argument('-t', '--tol-min', type=float, default=20)
+    args = parser.parse_args()
+
+    main = make_table(args.files, 0)
+    other = make_table(args.files, 1)
+    dt0s = list(main['datetime'])
+
+    t0 = time.perf_counter()
+    old = legacy(dt0s, other['fn'].tolist(), list(other['datetime']),
+                 args.tol_min)
+    t1 = time.perf_counter()
+    new = utils.match_nearest(main['datetime'], other, args.tol_min)
+    t2 = time.perf_counter()
+
+    assert pd.Series(old, dtype=object).equals(pd.Series(new)), \
+        'outputs differ'
+    print(f'{args.files} x {args.files} files: legacy {t1 - t0:.3f} s, '
+          f'match_nearest {t2 - t1:.3f} s, x{(t1 - t0) / (t2 - t1):.1f}')
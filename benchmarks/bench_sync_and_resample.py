@@ -0,0 +1,75 @@
+"""
+Equivalence check and benchmark of ImportLib.sync_and_resample: the binned
+path against the old merge in turn (_sync_merge), on synthetic MAVLink
+message frames with all-NaN rows and columns, gaps which leave empty bins,
+and column names repeated across frames, with and without keep_one and
+per-column aggregation. Run with
+
+    python benchmarks/bench_sync_and_resample.py [-s SECONDS]
+"""
+
+from argparse import ArgumentParser
+import time
+
+import numpy as np
+import pandas as pd
+
+from oproc.ArchiveHandler import ImportLib as im
+
+
+def make_frame(rng, start: pd.Timestamp, seconds: float, hz: float,
+               cols: list) -> pd.DataFrame:
+    """Frame of random values at jittered times, indexed by timestamp"""
+    n = int(seconds * hz)
+    t = start + pd.to_timedelta(np.sort(rng.uniform(0, seconds, n)),
+                                unit='s')
+    df = pd.DataFrame(dict([(c, rng.normal(size=n)) for c in cols]),
+                      index=pd.DatetimeIndex(t, name='timestamp'))
+    return df[~df.index.duplicated()]
+
+
+def make_frames(seconds: float) -> list:
+    rng = np.random.default_rng(0)
+    t0 = pd.Timestamp('2022-03-04 10:00:00.037')
+    att = make_frame(rng, t0, seconds, 10, ['Roll', 'Pitch', 'Yaw'])
+    # All NaN rows, including the first and last, and scattered NaNs
+    att.iloc[[0, 5, -1]] = np.nan
+    att.iloc[rng.integers(0, len(att), len(att) // 20), 1] = np.nan
+    gps = make_frame(rng, t0, seconds, 5, ['Lat', 'Lng', 'Alt'])
+    # A gap of 5 s, leaving empty bins
+    gap = (gps.index > t0 + pd.Timedelta(seconds=10)) & \
+        (gps.index < t0 + pd.Timedelta(seconds=15))
+    gps = gps[~gap]
+    # Alt repeats GPS, Empty is all NaN
+    baro = make_frame(rng, t0, seconds, 8, ['Alt', 'Press', 'Empty'])
+    baro['Empty'] = np.nan
+    # Repeats Alt again, and an integer count column
+    ekf = make_frame(rng, t0 + pd.Timedelta(seconds=2), seconds - 4, 3,
+                     ['Alt', 'Status'])
+    ekf['Status'] = rng.integers(0, 4, len(ekf))
+    return [att, gps, baro, ekf]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('-s', '--seconds', type=float, default=600)
+    args = parser.parse_args()
+
+    frames = make_frames(args.seconds)
+    freq = pd.tseries.frequencies.to_offset('0.1S')
+    assert im._no_bins(frames, freq) is None, 'frames would not be binned'
+
+    for keep_one in [False, True]:
+        for agg in [None, {'Status': 'sum', 'Roll': 'last', 'Lat': 'last'}]:
+            t0 = time.perf_counter()
+            new = im.sync_and_resample(frames, '0.1S', keep_one=keep_one,
+                                       agg=agg)
+            t1 = time.perf_counter()
+            old = im._sync_merge(frames, '0.1S', keep_one, agg or {})
+            t2 = time.perf_counter()
+            pd.testing.assert_frame_equal(new, old, check_exact=False,
+                                          rtol=1e-12)
+            print(f'keep_one={keep_one}, agg={agg}: {len(new)} rows, '
+                  f'{list(new.columns)}')
+            print(f'  binned {t1 - t0:.3f} s, merged {t2 - t1:.3f} s, '
+                  f'x{(t2 - t1) / (t1 - t0):.1f}')
@@ -0,0 +1,56 @@
+"""
+Benchmark of the Time_p# assembly in RawFile.__proc_cols: the old per-row
+join of the concatenated matrix against ImportLib.join_columns, on a
+synthetic split-time CSV. Run with
+
+    python benchmarks/bench_time_parts.py [-n ROWS]
+"""
+
+from argparse import ArgumentParser
+import tempfile
+import time
+import os
+
+import numpy as np
+import pandas as pd
+
+from oproc.ArchiveHandler import ImportLib as im
+
+
+def make_csv(path: str, n: int):
+    """Writes a csv with the date, time and decimal seconds in 3 columns"""
+    t = pd.date_range('2022-03-04 10:00:00', periods=n, freq='100ms')
+    pd.DataFrame({'Time_p1': t.strftime('%Y-%m-%d'),
+                  'Time_p2': t.strftime('%H:%M:%S'),
+                  'Time_p3': t.microsecond // 1000,
+                  'val': np.random.rand(n)}).to_csv(path, index=False)
+
+
+def legacy(parts: list) -> list:
+    """The old path; matrix concat and a python join per row"""
+    dlen = len(parts[0])
+    parts = [np.matrix(x).reshape(dlen, 1) for x in parts]
+    parts = np.concatenate(parts, axis=1)
+    return [' '.join(str(idx) for idx in sub) for sub in parts.tolist()]
+
+
+if __name__ == '__main__':
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('-n', '--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as d:
+        fn = os.path.join(d, 'bench.csv')
+        make_csv(fn, args.rows)
+        df = pd.read_csv(fn)
+    parts = [df[f'Time_p{i}'] for i in range(1, 4)]
+
+    t0 = time.perf_counter()
+    old = legacy(parts)
+    t1 = time.perf_counter()
+    new = im.join_columns(parts)
+    t2 = time.perf_counter()
+
+    assert old == new.tolist(), 'outputs differ'
+    print(f'{args.rows} rows: legacy {t1 - t0:.3f} s, '
+          f'join_columns {t2 - t1:.3f} s, x{(t1 - t0) / (t2 - t1):.1f}')
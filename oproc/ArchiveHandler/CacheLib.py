@@ -0,0 +1,207 @@
+"""
+On-disk cache of parsed raw files. Entries hold the column arrays and time
+index a raw file parses to, before they are made into a MatrixDict, as .npz
+files under "base_data_path"/Cache. Entries are keyed by the file path, size
+and modification time, the iss record used to parse it, the read options,
+the oproc version and CACHE_FORMAT, so any change to one of them is a miss. The cache is
+bounded by the optional "raw_cache_size_mb" config setting, and the least
+recently used entries are evicted first.
+"""
+
+from .. import ConfigHandler as ch
+from .. import __version__
+from . import Utilities as utils
+
+import os.path
+import hashlib
+import json
+import zipfile
+import zlib
+import numpy as np
+import pandas as pd
+import logging
+
+
+log = logging.getLogger(__name__)
+
+CACHE_DIR = 'Cache'
+DEFAULT_SIZE_MB = 1024
+# Version of what RawFile parses files to; bump it whenever the parsing
+# (RawFile, MavLib, ImportLib helpers, &c) changes, so old entries miss
+CACHE_FORMAT = 3
+
+_stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+
+def cache_dir() -> str:
+    """Cache directory, created if it does not exist"""
+    path = os.path.join(ch.getval('base_data_path'), CACHE_DIR)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def size_limit() -> int:
+    """Cache size limit in bytes"""
+    try:
+        mb = ch.getval('raw_cache_size_mb')
+    except AttributeError:
+        mb = DEFAULT_SIZE_MB
+    return int(mb * 1024 ** 2)
+
+
+def make_key(path: str, rec: dict, **kwargs) -> str:
+    """
+    Cache key of a raw file
+
+    :param path: abs path of the file
+    :param rec: iss record the file is parsed with
+    :param kwargs: read options which change the output (window, &c)
+    """
+    st = os.stat(path)
+    parts = [os.path.abspath(path), st.st_size, st.st_mtime_ns, rec,
+             __version__, CACHE_FORMAT,
+             dict([(k, str(v)) for k, v in kwargs.items()])]
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str)
+                        .encode()).hexdigest()
+
+
+def get(key: str) -> tuple | None:
+    """
+    Returns a cached (data dict, units) tuple, or None on a miss
+    """
+    path = os.path.join(cache_dir(), key + '.npz')
+    try:
+        with np.load(path, allow_pickle=False) as f:
+            meta = json.loads(str(f['__meta__']))
+            data = {}
+            for name, kind, arr in meta['cols']:
+                if kind == 'matrix':
+                    data[name] = np.matrix(f[arr])
+                elif kind == 'array':
+                    data[name] = f[arr]
+                elif kind == 'index':
+                    data[name] = pd.DatetimeIndex(f[arr], name=meta['index'])
+                else:
+                    data[name] = meta['json'][name]
+    except FileNotFoundError:
+        _stats['misses'] += 1
+        return None
+    except (OSError, ValueError, KeyError, EOFError, zipfile.BadZipFile,
+            zlib.error) as e:
+        # Truncated or corrupt entry
+        log.warning('Dropping unreadable cache entry %s (%s)', key, e)
+        _remove(path)
+        _stats['misses'] += 1
+        return None
+    # Mark as recently used
+    os.utime(path)
+    _stats['hits'] += 1
+    log.debug('Cache hit %s', key)
+    return data, meta['units']
+
+
+def put(key: str, data: dict, units: dict) -> bool:
+    """
+    Stores a (data dict, units) tuple. Values which cannot be stored without
+    pickling (object arrays, &c) mean the entry is not cached.
+
+    :return: True if the entry was written
+    """
+    arrays = {}
+    meta = {'cols': [], 'json': {}, 'units': units, 'index': None}
+    try:
+        for i, (name, v) in enumerate(data.items()):
+            if isinstance(v, pd.DatetimeIndex):
+                arrays[f'a{i}'] = v.to_numpy()
+                meta['index'] = v.name
+                meta['cols'].append([name, 'index', f'a{i}'])
+            elif isinstance(v, np.ndarray):
+                if v.dtype.hasobject:
+                    raise TypeError(f'{name} is an object array')
+                arrays[f'a{i}'] = np.asarray(v)
+                meta['cols'].append([name, 'matrix' if
+                                     isinstance(v, np.matrix) else 'array',
+                                     f'a{i}'])
+            else:
+                json.dumps(v)
+                meta['json'][name] = v
+                meta['cols'].append([name, 'json', None])
+        arrays['__meta__'] = np.array(json.dumps(meta))
+    except TypeError as e:
+        log.debug('Not caching %s: %s', key, e)
+        return False
+    path = os.path.join(cache_dir(), key + '.npz')
+    try:
+        with utils.atomic_output(path) as tmp:
+            with open(tmp, 'wb') as f:
+                np.savez(f, **arrays)
+    except OSError as e:
+        log.warning('Could not write cache entry %s (%s)', key, e)
+        return False
+    _stats['writes'] += 1
+    evict()
+    return True
+
+
+def entries() -> list[tuple]:
+    """(path, size, mtime) of each cache entry, least recently used first"""
+    path = cache_dir()
+    out = []
+    for fn in utils.list_dir(path):
+        if not fn.endswith('.npz'):
+            continue
+        try:
+            st = os.stat(os.path.join(path, fn))
+        except FileNotFoundError:
+            continue
+        out.append((os.path.join(path, fn), st.st_size, st.st_mtime))
+    out.sort(key=lambda x: x[2])
+    return out
+
+
+def evict(limit: int | None = None) -> int:
+    """
+    Removes least recently used entries until the cache fits the limit
+
+    :param limit: size in bytes, default from size_limit()
+
+    :return: number of entries removed
+    """
+    limit = size_limit() if limit is None else limit
+    ents = entries()
+    total = sum(x[1] for x in ents)
+    n = 0
+    for path, size, _ in ents:
+        if total <= limit:
+            break
+        _remove(path)
+        total = total - size
+        n = n + 1
+    if n:
+        _stats['evictions'] += n
+        log.debug('Evicted %i cache entries', n)
+    return n
+
+
+def clear() -> int:
+    """Removes all cache entries, returns the number removed"""
+    ents = entries()
+    for path, _, _ in ents:
+        _remove(path)
+    return len(ents)
+
+
+def stats() -> dict:
+    """Cache size and entry count, plus this process's hit/miss counts"""
+    ents = entries()
+    return {'path': cache_dir(),
+            'entries': len(ents),
+            'size_mb': sum(x[1] for x in ents) / 1024 ** 2,
+            'limit_mb': size_limit() / 1024 ** 2} | _stats
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,88 @@
+"""
+Compiled index of the "valid_flags" config setting. Used for flag validation
+and flag metadata (unit, description, display name) lookup.
+"""
+
+from .. import ConfigHandler as ch
+
+import re
+
+
+# Matches the numbered part of a tag, e.g. the "12" in "C12"
+_num_re = re.compile(r'(?=\d)\w+')
+
+# Indexes by id of the valid_flags value they were built from
+_index = {}
+
+
+class FlagIndex(object):
+    """
+    Name indexed view of the valid flags list.
+
+    :param valid_flags: the "valid_flags" config value
+    :param tag_suffix: the "tag_suffix" config value
+    """
+
+    def __init__(self, valid_flags: list[dict], tag_suffix: str):
+        self.flags: list[dict] = valid_flags
+        self.tag_suffix: str = tag_suffix
+        self.by_name: dict = dict([(x['name'], x) for x in valid_flags])
+        self.units: dict = dict([(x['name'], x['unit']) for x in valid_flags])
+        self.__templates: dict = {}
+
+    def template(self, tag: str) -> str:
+        """Maps a numbered tag to its flag name, e.g. C12 -> C#"""
+        try:
+            return self.__templates[tag]
+        except KeyError:
+            pass
+        m = _num_re.search(tag)
+        flag = tag.replace(m.group(), self.tag_suffix) if m else tag
+        self.__templates[tag] = flag
+        return flag
+
+    def lookup(self, tag: str) -> dict:
+        """
+        Returns the flag record for a tag
+
+        :raise LookupError: if the tag is not a valid flag
+        """
+        flag = self.template(tag)
+        try:
+            return self.by_name[flag]
+        except KeyError:
+            raise LookupError(f'{flag} Not found in valid tags variable')
+
+    def validate(self, tags) -> list[str]:
+        """Returns the tags from an iterable which are not valid flags"""
+        return [x for x in tags if self.template(x) not in self.by_name]
+
+    def __contains__(self, tag: str) -> bool:
+        return self.template(tag) in self.by_name
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def __repr__(self):
+        return f'FlagIndex({len(self)})'
+
+
+def get_index(ctx=None) -> FlagIndex:
+    """
+    Returns the flag index for the current config. The index is rebuilt
+    only when the config values it was built from change.
+
+    :param ctx: RunContext to read the config from, default ConfigHandler
+    """
+    src = ch if ctx is None else ctx
+    # Not copied, so vf is the same object until the config changes
+    vf = src.peek('valid_flags')
+    ts = src.peek('tag_suffix')
+    # Cached indexes keep a reference to vf, so the id cannot be reused
+    fi = _index.get(id(vf))
+    if (fi is None) or (fi.flags is not vf) or (fi.tag_suffix != ts):
+        if len(_index) > 8:
+            _index.clear()
+        fi = FlagIndex(vf, ts)
+        _index[id(vf)] = fi
+    return fi
@@ -3,18 +3,26 @@ import pandas as pd
 import numpy as np
 from .MatrixColumn import MatrixColumn
 from .. import ImportLib as im
-from ... import newprint
+from .. import FlagLib as fl
+from ...ConfigHandler import RunContext as rc
+import logging
 
 
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class DataStruct(object):
     """
     Template data structure
+
+    :param dat: data dict, must contain "Time" and "date_time"
+    :param unit_spec: units of the data
+    :param ctx: run context, defaults to the active context
     """
 
-    def __init__(self, dat: dict, unit_spec: dict = None):
+    def __init__(self, dat: dict, unit_spec: dict = None,
+                 ctx: rc.RunContext | None = None):
+        self.ctx: rc.RunContext = rc.current() if ctx is None else ctx
         self.__unit_spec = None
         self.__col_dict = None
         self.__date_time = None
@@ -35,7 +43,7 @@ class DataStruct(object):
 
     def _self_check(self):
         if not self.col_dict:
-            print("col_dict not populated")
+            log.debug("col_dict not populated")
         else:
             for k, v in self.col_dict.items():
                 if not isinstance(v, MatrixColumn):
@@ -80,7 +88,9 @@ class DataStruct(object):
         for k, v in val.items():
             if not isinstance(v, str):
                 raise TypeError
-            im.check_flags(k)
+        bad = fl.get_index(self.ctx).validate(val)
+        if bad:
+            raise LookupError(f'{bad} Not found in valid tags variable')
         self.__unit_spec = val
 
     @property
@@ -1,16 +1,15 @@
 import numpy as np
 import pandas as pd
-import re
 from .MatrixColumn import MatrixColumn
 from .DataStruct import DataStruct
 from ... import ureg
-from ... import newprint
 from ... import ConfigHandler as ch
 from ...ArchiveHandler import ImportLib as im
+from ...ArchiveHandler import FlagLib as fl
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class MatrixDict(DataStruct):
@@ -18,8 +17,8 @@ class MatrixDict(DataStruct):
 
     def init(self, dat: dict, unit_spec: dict | str = None):
 
-        self.__out_unit = dict([(x['name'], x['unit'])
-                                for x in ch.getval('valid_flags')])
+        self.__flags = fl.get_index(self.ctx)
+        self.__out_unit = self.__flags.units
 
         if not unit_spec:
             raise ValueError("No units specified")
@@ -49,25 +48,22 @@ class MatrixDict(DataStruct):
                 self.non_col[k] = v
 
     def __convert_units(self, tag: str, val: np.matrix):
-        try:
-            flag = tag.replace(re.search(r'(?=\d)\w+', tag).group(), '#')
-        except AttributeError:
-            flag = tag
+        flag = self.__flags.template(tag)
         if tag not in self.unit_spec:
-            print("%s has no unit to convert" % tag)
+            log.debug("%s has no unit to convert", tag)
             return val
         elif self.unit_spec[tag] == self.__out_unit[flag]:
-            print("%s is already at correct unit" % tag)
+            log.debug("%s is already at correct unit", tag)
             return val
         else:
-            print("converting %s from %s to %s" %
-                  (tag, self.unit_spec[tag], self.__out_unit[flag]))
+            log.debug("converting %s from %s to %s",
+                      tag, self.unit_spec[tag], self.__out_unit[flag])
             val = (val * ureg(self.unit_spec[tag]))\
                 .to(ureg(self.__out_unit[flag]))
             return val.magnitude
 
     def _self_check(self):
-        print("Self check not implemented for MatrixDict")
+        log.debug("Self check not implemented for MatrixDict")
         pass
 
     def __sync2(self, other) -> dict:
@@ -79,6 +75,37 @@ class MatrixDict(DataStruct):
         dd['Time'] = df.index
         return dd
 
+    def __align(self, other) -> tuple | None:
+        """
+        Columns of self and other on the union of their times, for unique
+        times and numeric columns, as __sync2 would give them; None if the
+        merge in __sync2 is needed
+        """
+        if not (self.Time.is_unique and other.Time.is_unique):
+            return None
+        Time = self.Time.union(other.Time)
+        if not isinstance(Time, pd.DatetimeIndex):
+            return None
+        cols = [(k, v.__get__()) for k, v in self.col_dict.items()] + \
+            [(k, v.__get__()) for k, v in other.col_dict.items()
+             if k not in self.col_dict]
+        if any(v.dtype.kind not in 'iuf' for _, v in cols):
+            return None
+        li = self.Time.get_indexer(Time)
+        ri = other.Time.get_indexer(Time)
+        dd = {}
+        for k, v in cols:
+            i = li if k in self.col_dict else ri
+            x = np.asarray(v).ravel()
+            if (i < 0).any():
+                # Missing rows upcast ints to float, as a merge does
+                x = x.astype(np.float64) if x.dtype.kind in 'iu' else x
+                x = np.where(i < 0, np.nan, x.take(i) if len(x) else np.nan)
+            else:
+                x = x.take(i)
+            dd[k] = np.matrix(x).T
+        return Time, dd
+
     def __get__(self) -> dict:
         """return the dict plus non col values combined"""
         return self.col_dict | self.non_col | {"Time": self.Time} |\
@@ -102,12 +129,28 @@ class MatrixDict(DataStruct):
         if not isinstance(other, MatrixDict):
             raise TypeError
         non_col = self.non_col | other.non_col
-        dd = self.__sync2(other)
-        Time = dd["Time"]
-        dd.pop("Time", None)
+        if self.Time.equals(other.Time) and self.Time.is_unique and \
+                self.Time.is_monotonic_increasing:
+            # Same times, so the columns are shared rather than copied;
+            # columns of self win, as in __sync2
+            Time = self.Time.rename('Time')
+            dd = self.col_dict | dict([(k, v) for k, v in
+                                       other.col_dict.items()
+                                       if k not in self.col_dict])
+            return MatrixDict(non_col | dd | {"Time": Time},
+                              unit_spec="default", ctx=self.ctx)
+        aligned = self.__align(other)
+        if aligned is None:
+            dd = self.__sync2(other)
+            Time = dd["Time"]
+            dd.pop("Time", None)
+        else:
+            Time, dd = aligned
+            Time = Time.rename('Time')
         dd = dict([(k, MatrixColumn(k, v, len(Time)))
                    for k, v in dd.items()])
-        return MatrixDict(non_col | dd | {"Time":Time}, unit_spec="default")
+        return MatrixDict(non_col | dd | {"Time":Time}, unit_spec="default",
+                          ctx=self.ctx)
 
     def add_nc(self, nc: dict, units: dict):
         """append a dict to the non col variable and update units"""
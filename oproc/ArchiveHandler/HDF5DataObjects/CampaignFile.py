@@ -7,12 +7,11 @@ from datetime import datetime as dt
 from .. import HDF5Lib as h5l
 from ..GenericDataObjects.MatrixDict import MatrixDict as md
 from .H5dd import H5dd
-from ... import ConfigHandler as ch
-from ... import newprint
+from ...ConfigHandler import RunContext as rc
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class CampaignFile(object):
@@ -28,9 +27,12 @@ class CampaignFile(object):
 
     :param fn: filename
     :param mode: file open mode
+    :param ctx: run context, defaults to the active context
     """
 
-    def __init__(self, fn: str, mode: str = 'r'):
+    def __init__(self, fn: str, mode: str = 'r',
+                 ctx: rc.RunContext | None = None):
+        self.ctx = rc.current() if ctx is None else ctx
         self.__fn = None
         self.fn = fn
 
@@ -40,9 +42,9 @@ class CampaignFile(object):
         self.__dd: H5dd | None = None
         self.__f = None
 
-        self.h5ver: str = ch.getval('h5ver')
+        self.h5ver: str = self.ctx.getval('h5ver')
 
-        print(f'File check returns {bool(self)}')
+        log.debug('File check returns %s', bool(self))
 
     def __bool__(self):
         return self.__file_check()
@@ -84,19 +86,19 @@ class CampaignFile(object):
         elif not self.__dd:
             raise AttributeError("data dict not set")
         elif bool(self):
-            print(f"File check is {bool(self)}")
+            log.info("File check is %s", bool(self))
             if ("w" not in self.mode) or ("a" not in self.mode):
                 raise AttributeError("Wrong mode to create file")
             if "w" in self.mode:
                 while True:
                     ui = input(f"Write over file {self.fn}? (y/n)")
                     if ui == "n":
-                        print("Aborting write")
+                        log.info("Aborting write")
                         raise FileExistsError
                     elif ui == "y":
                         break
                     else:
-                        print(f"Invalid option {ui}")
+                        log.warning("Invalid option %s", ui)
                         continue
         elif self.mode == "r":
             raise AttributeError("File opened in read mode, cannot write")
@@ -111,26 +113,26 @@ class CampaignFile(object):
                 raise FileExistsError
             except ValueError:
                 pass
-        print(f"Writing groups {wg} to file {self.fn}")
+        log.info("Writing groups %s to file %s", wg, self.fn)
         [self.__f.create_group(g) for g in wg]
         for g in wg:
             group = self.__f[g]
             df_group = group.create_group("columns")
             nc_group = group.create_group("extras")
 
-            print(f'Writing dataset to group {group}')
+            log.debug('Writing dataset to group %s', group)
             ds = df_group.create_dataset("dataframe", df[g].shape, data=df[g])
 
-            print(f'Writing metadata to dataset {ds}')
+            log.debug('Writing metadata to dataset %s', ds)
             ug = df_group.create_group("units")
             dg = df_group.create_group("descriptions")
             h5l.metadict_to_attrs(dfm[g][0], ug)
             h5l.metadict_to_attrs(dfm[g][1], dg)
 
-            print(f'Writing extra datasets in group {group}')
+            log.debug('Writing extra datasets in group %s', group)
             h5l.dict_to_dset(nc[g], nc_group)
 
-            print(f'Writing metadata to extra datasets')
+            log.debug('Writing metadata to extra datasets')
             ug = nc_group.create_group("units")
             dg = nc_group.create_group("descriptions")
             h5l.metadict_to_attrs(ncm[g][0], ug)
@@ -148,7 +150,7 @@ class CampaignFile(object):
             nth = lambda o, i: o[list(o.keys())[i]]
             #nth = lambda o, i: list(o.keys())[i]
             # columns group
-            print(x)
+            log.debug('%s', x)
             x00 = nth(nth(x, g), 0)
             df = pd.DataFrame(np.array(nth(x00, 0)))
             tmp_time = pd.DatetimeIndex(pd.to_datetime(df["Time"].values,\
@@ -182,7 +184,8 @@ class CampaignFile(object):
                 [tmpgrp[1].attrs[list(tmpgrp[1].attrs)[i]] \
                  for i in range(len(list(tmpgrp[1].attrs)))])}
 
-            data_dict = md(df | nc, unit_spec=col_units | ext_units)
+            data_dict = md(df | nc, unit_spec=col_units | ext_units,
+                           ctx=self.ctx)
             h5d = h5d + H5dd(data_dict)
         return h5d
 
@@ -211,7 +214,7 @@ class CampaignFile(object):
             return False
         for gn in self.__groups():
             try:
-                dt.strptime(gn, ch.getval("groupDTformat"))
+                dt.strptime(gn, self.ctx.getval("groupDTformat"))
             except ValueError:
                 return False
         return True
@@ -225,7 +228,7 @@ class CampaignFile(object):
         if os.path.isabs(val):
             self.__fn = val
         else:
-            proc_dir = ch.getval("base_data_path")
+            proc_dir = self.ctx.getval("base_data_path")
             self.__fn = os.path.join(proc_dir, "Processed", val)
 
     @property
@@ -8,11 +8,10 @@ from .. import HDF5Lib as h5l
 from ..GenericDataObjects.MatrixDict import MatrixDict as md
 from .H5dd import H5dd
 from ... import ConfigHandler as ch
-from ... import newprint
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class FlightFile(object):
@@ -29,7 +28,7 @@ class FlightFile(object):
 
         self.h5ver: str = ch.getval('h5ver')
 
-        print(f'File check returns {bool(self)}')
+        log.debug('File check returns %s', bool(self))
 
     def __bool__(self):
         return self.__file_check()
@@ -75,19 +74,19 @@ class FlightFile(object):
         elif not self.__dd:
             raise AttributeError("data dict not set")
         elif bool(self):
-            print(f"File check is {bool(self)}")
+            log.info("File check is %s", bool(self))
             if ("w" not in self.mode) or ("a" not in self.mode):
                 raise AttributeError("Wrong mode to create file")
             if "w" in self.mode:
                 while True:
                     ui = input(f"Write over file {self.fn}? (y/n)")
                     if ui == "n":
-                        print("Aborting write")
+                        log.info("Aborting write")
                         raise FileExistsError
                     elif ui == "y":
                         break
                     else:
-                        print(f"Invalid option {ui}")
+                        log.warning("Invalid option %s", ui)
                         continue
         elif self.mode == "r":
             raise AttributeError("File opened in read mode, cannot write")
@@ -102,26 +101,26 @@ class FlightFile(object):
                 raise FileExistsError
             except ValueError:
                 pass
-        print(f"Writing groups {wg} to file {self.fn}")
+        log.info("Writing groups %s to file %s", wg, self.fn)
         [self.__f.create_group(g) for g in wg]
         for g in wg:
             group = self.__f[g]
             df_group = group.create_group("columns")
             nc_group = group.create_group("extras")
 
-            print(f'Writing dataset to group {group}')
+            log.debug('Writing dataset to group %s', group)
             ds = df_group.create_dataset("dataframe", df[g].shape, data=df[g])
 
-            print(f'Writing metadata to dataset {ds}')
+            log.debug('Writing metadata to dataset %s', ds)
             ug = df_group.create_group("units")
             dg = df_group.create_group("descriptions")
             h5l.metadict_to_attrs(dfm[g][0], ug)
             h5l.metadict_to_attrs(dfm[g][1], dg)
 
-            print(f'Writing extra datasets in group {group}')
+            log.debug('Writing extra datasets in group %s', group)
             h5l.dict_to_dset(nc[g], nc_group)
 
-            print(f'Writing metadata to extra datasets')
+            log.debug('Writing metadata to extra datasets')
             ug = nc_group.create_group("units")
             dg = nc_group.create_group("descriptions")
             h5l.metadict_to_attrs(ncm[g][0], ug)
@@ -139,7 +138,7 @@ class FlightFile(object):
             nth = lambda o, i: o[list(o.keys())[i]]
             #nth = lambda o, i: list(o.keys())[i]
             # columns group
-            print(x)
+            log.debug('%s', x)
             x00 = nth(nth(x, g), 0)
             df = pd.DataFrame(np.array(nth(x00, 0)))
             tmp_time = pd.DatetimeIndex(pd.to_datetime(df["Time"].values,\
@@ -1,11 +1,11 @@
 from datetime import datetime as dt
 from ... import ConfigHandler as ch
-from ... import newprint
+from .. import FlagLib as fl
 from ..GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class H5dd(object):
@@ -17,7 +17,7 @@ class H5dd(object):
     def __init__(self, matrix_dict: list[md] | md | None):
 
         if matrix_dict is None:
-            print("Creating blank H5dd")
+            log.debug("Creating blank H5dd")
             self.md = []
             self.__gn = []
             self.date_times = []
@@ -32,7 +32,7 @@ class H5dd(object):
                                          for x in self.md]
             self.__gn: list[str] = [x.strftime(ch.getval("groupDTformat"))
                                     for x in self.date_times]
-            print(f'Creating HDF5 dict with group(s) {self.gn}')
+            log.debug('Creating HDF5 dict with group(s) %s', self.gn)
 
     def __add__(self, other):
         self.md = self.md + other.md
@@ -64,10 +64,10 @@ class H5dd(object):
 
     def df_meta(self) -> dict:
         """main col dataframe attributes; group: ({units}, {descriptions})"""
-        vf = ch.getval('valid_flags')
+        vf = fl.get_index().by_name
         out = {}
         for g, m in zip(self.gn, self.md):
-            desc = [x for x in vf if x["name"] in list(m.col_dict.keys())]
+            desc = [vf[k] for k in m.col_dict if k in vf]
             unit = {x['name']: x['unit'] for x in desc}
             desc = {x['name']: x['desc'] for x in desc}
             out[g] = (unit, desc)
@@ -79,10 +79,10 @@ class H5dd(object):
 
     def nc_meta(self) -> dict:
         """non-col attributes; group: ({units}, {descriptions})"""
-        vf = ch.getval('valid_flags')
+        vf = fl.get_index().by_name
         out = {}
         for g, m in zip(self.gn, self.md):
-            desc = [x for x in vf if x["name"] in list(m.non_col.keys())]
+            desc = [vf[k] for k in m.non_col if k in vf]
             unit = {x['name']: x['unit'] for x in desc}
             desc = {x['name']: x['desc'] for x in desc}
             out[g] = (unit, desc)
@@ -1,12 +1,11 @@
 from datetime import datetime as dt
 from ... import ConfigHandler as ch
-from ... import newprint
 from ..GenericDataObjects.MatrixDict import MatrixDict as md
 from ..RawDataObjects.MetaDataObject import MetaDataObject as meta
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class H5dd(object):
@@ -19,7 +18,7 @@ class H5dd(object):
                  group_meta: list[meta] | meta | None):
 
         if (matrix_dict is None) and (group_meta is None):
-            print("Creating blank H5dd")
+            log.debug("Creating blank H5dd")
             self.group_meta = []
             self.md = []
             self.__gn = []
@@ -47,7 +46,7 @@ class H5dd(object):
                                          for x in self.md]
             self.__gn: list[str] = [x.strftime(ch.getval("groupDTformat"))
                                     for x in self.date_times]
-            print(f'Creating HDF5 dict with group(s) {self.gn}')
+            log.debug('Creating HDF5 dict with group(s) %s', self.gn)
 
     def __add__(self, other):
         self.group_meta = self.group_meta + other.group_meta
@@ -11,11 +11,10 @@ import pandas as pd
 import typing
 
 from .. import ConfigHandler as ch
-from .. import newprint
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 def dict_to_dset(dat: list[dict] | dict,
@@ -41,7 +40,7 @@ def dict_to_dset(dat: list[dict] | dict,
                     v = float(v)
                     lv = 1
                 else:
-                    print(f"skipping {v}")
+                    log.debug("skipping %s", v)
                     continue
             elif isinstance(v, (float, int)):
                 v = float(v)
@@ -56,13 +55,12 @@ def dict_to_dset(dat: list[dict] | dict,
                 v = np.asarray(v, dtype=float)
                 lv = v.shape
             else:
-                print(f"skipping {v}")
+                log.debug("skipping %s", v)
                 continue
             length.append(lv)
             names.append(k)
             vals.append(v)
-    print(names)
-    print(vals)
+    log.debug("writing datasets %s", names)
     return [grp.create_dataset(n, s, data=v)
             for n, v, s in zip(names, vals, length)]
 
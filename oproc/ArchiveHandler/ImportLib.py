@@ -5,51 +5,95 @@ Contains functions for importing raw data into the software.
 from .. import ConfigHandler as ch
 from .. import tag_suffix as tf
 from . import Utilities as utils
-from .. import newprint
+from . import FlagLib as fl
 #from .GenericDataObjects.MatrixDict import MatrixDict as md
 #from .RawDataObjects.MetaDataObject import MetaDataObject
 from .RawDataObjects.iss import iss as isso
 
 from dateutil.parser import *
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:
+    # Not public before pandas 2.0
+    from pandas._libs.tslibs.parsing import guess_datetime_format
 from collections.abc import MutableMapping
 import os.path
 import inspect
+import bisect
+import copy
 import datetime as dt
 import pandas as pd
 import numpy as np
 import re
 import pytz
 import json
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
+# Instrument registry and parsed instrument data of this process
+_instruments = {}
+_instrument_json = {}
 
-def read_instrument_data(name: str) -> dict:
+
+def read_instrument_data(name: str, at=None) -> dict:
     """
-    function to get instrument data. Files must be named with a datetime
+    function to get instrument data. Files must be named with the date they
+    are valid from; the newest file dated strictly before "at" is used.
     :param name: this is the name of the instrument, must be contained within
     the filename.
+    :param at: datetime the data must be valid at, e.g. the flight datetime;
+    naive datetimes are taken as UTC. Default is now.
     """
-    def __get_dt(fn):
-        x = pd.to_datetime(fn.split('_')[-1].split('.')[0], format='%Y%m%d')
-        return pytz.UTC.localize(x)
+    at = pd.Timestamp.now(tz='UTC') if at is None else pd.Timestamp(at)
+    at = at.tz_localize('UTC') if at.tzinfo is None else at.tz_convert('UTC')
     cali_path = ch.getval('instrument_data_path')
-    cal_file = []
-    for fn in os.listdir(cali_path):
-        if name in fn:
-            cal_file.append(fn)
-    if not cal_file:
+    dates, fns = _instrument_registry(cali_path, name)
+    if not fns:
         raise FileNotFoundError("Calibration file does not exist")
-    cali_dt = [__get_dt(x) for x in cal_file]
-    now = dt.datetime.now(pytz.utc)
-    newest = max(x for x in cali_dt if x < now)
-    cal_file = cal_file[cali_dt.index(newest)]
-    cali_path = os.path.join(cali_path, cal_file)
-    with open(cali_path) as cf:
-        cfd = dict(json.load(cf))
-    return cfd
+    i = bisect.bisect_left(dates, at.tz_localize(None)) - 1
+    if i < 0:
+        raise ValueError(f"No {name} instrument data before {at}")
+    path = os.path.join(cali_path, fns[i])
+    mtime = os.stat(path).st_mtime_ns
+    try:
+        cfd = _instrument_json[path][1] \
+            if _instrument_json[path][0] == mtime else None
+    except KeyError:
+        cfd = None
+    if cfd is None:
+        with open(path) as cf:
+            cfd = dict(json.load(cf))
+        _instrument_json[path] = (mtime, cfd)
+    log.debug('Instrument data for %s at %s from %s', name, at, fns[i])
+    return copy.deepcopy(cfd)
+
+
+def _instrument_registry(cali_path: str, name: str) -> tuple:
+    """
+    Sorted (valid-from dates, filenames) of an instrument, from the index of
+    the instrument data directory; rebuilt when the index changes
+    """
+    table = utils.dir_index(cali_path, 'instrument_data',
+                            parse=_instrument_dts)
+    try:
+        if _instruments[(cali_path, name)][0] is table:
+            return _instruments[(cali_path, name)][1]
+    except KeyError:
+        pass
+    table_n = table[table['fn'].str.contains(name, regex=False)]
+    reg = (list(table_n['datetime']), table_n['fn'].tolist())
+    _instruments[(cali_path, name)] = (table, reg)
+    return reg
+
+
+def _instrument_dts(fn: list) -> pd.DatetimeIndex:
+    """Instrument data file dates, the last "_" field of the name"""
+    dts = pd.Series([os.path.splitext(x)[0].split('_')[-1] for x in fn],
+                    dtype=object)
+    return pd.DatetimeIndex(pd.to_datetime(dts, format='%Y%m%d',
+                                           errors='coerce'))
 
 
 def tag_generic_to_numeric(tag: str, q_list: list[str]) -> str:
@@ -72,11 +116,13 @@ def tag_prefix(tag: str) -> str:
 
 def check_flags(k: str, rt: bool = False, q_list: list[str] = None) -> dict:
     """Checks if a single flag is valid"""
-    if q_list:
-        vf = q_list
-    else:
-        vf = ch.getval('valid_flags')
+    if not q_list:
+        rec = fl.get_index().lookup(k)
+        if rt is True:
+            return rec
+        return
 
+    vf = q_list
     try:
         flag = k.replace(re.search(r'(?=\d)\w+', k).group(), tf)
     except AttributeError:
@@ -122,7 +168,7 @@ def types_from_iss(iss: dict) -> list:
 
 def get_iss() -> dict:
     """Retreives and sorts import struct spec from config values"""
-    print("retrieving iss from config")
+    log.debug("retrieving iss from config")
     iss = ch.getval("data_flags")
     # Sort iss for priority assignment
     k = list(iss.keys())
@@ -168,18 +214,122 @@ def get_ucass_calibration(serial_number: str) -> tuple:
 
 
 def sync_and_resample(df_list: list, period_str: str,
-                      keep_one: bool = False) -> pd.DataFrame:
+                      keep_one: bool = False,
+                      agg: dict | None = None) -> pd.DataFrame:
     """
     A function to synchronise a number of pandas data frames, then resample
-    with a given time period.
+    with a given time period. Each frame is binned onto the output grid on
+    its own and the bins are joined once; frames with duplicate timestamps,
+    non-numeric columns or non-fixed periods fall back to merging them in
+    turn.
 
     :param df_list: A list of pandas data frames to be synchronised
     :param period_str: The time period for resampling e.g. '0.1S'
     :param keep_one: if two col names are the same, keep one (True) or both
+    :param agg: aggregation of output columns, 'mean' (default), 'last' or
+    'sum'; bins without samples are nan, then back filled, for all three
 
     :return: The synchronised and resampled data frame.
     """
-
+    agg = {} if agg is None else agg
+    names = _merged_names(df_list, keep_one)
+    drop = [n for cols in names for n in cols if '%%SUFFIX%%' in n]
+    if drop:
+        log.debug('Dropping duplicate columns %s',
+                  [n.replace('_%%SUFFIX%%', '') for n in drop])
+    freq = pd.tseries.frequencies.to_offset(period_str)
+    why = _no_bins(df_list, freq)
+    if why:
+        log.debug('Merging frames in turn: %s', why)
+        return _sync_merge(df_list, period_str, keep_one, agg)
+
+    # Rows count towards the time range if they have any kept value
+    cols, t_kept = [], []
+    for df, ns in zip(df_list, names):
+        if not df.index.is_monotonic_increasing:
+            df = df.sort_index(kind='stable')
+        t = df.index.asi8
+        keep = [i for i, n in enumerate(ns) if '%%SUFFIX%%' not in n]
+        vals = [df.iloc[:, i].to_numpy(dtype=np.float64) for i in keep]
+        if vals:
+            t_kept.append(t[~np.all(np.isnan(np.vstack(vals)), axis=0)])
+        cols += [(ns[i], t, v) for i, v in zip(keep, vals)]
+    t_kept = np.concatenate(t_kept) if t_kept else np.array([], np.int64)
+    if not len(t_kept):
+        return _sync_merge(df_list, period_str, keep_one, agg)
+
+    # Bins of the resample; left closed, origin at the start of the day
+    step = freq.nanos
+    t0 = pd.Timestamp(t_kept.min())
+    origin = t0.normalize().value
+    k0 = (t0.value - origin) // step
+    nb = (t_kept.max() - origin) // step - k0 + 1
+    out = {}
+    for n, t, v in cols:
+        ok = ~np.isnan(v)
+        if not ok.any():
+            continue
+        k = (t[ok] - origin) // step - k0
+        how = agg.get(n, 'mean')
+        cnt = np.bincount(k, minlength=nb)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            if how == 'mean':
+                b = np.bincount(k, weights=v[ok], minlength=nb) / cnt
+            elif how == 'sum':
+                b = np.where(cnt > 0, np.bincount(k, weights=v[ok],
+                                                  minlength=nb), np.nan)
+            elif how == 'last':
+                pos = np.full(nb, -1)
+                np.maximum.at(pos, k, np.arange(len(k)))
+                b = np.where(pos >= 0, v[ok][pos], np.nan)
+            else:
+                raise ValueError(f'Invalid aggregation {how} for {n}')
+        out[n] = b
+    index_names = set(df.index.name for df in df_list)
+    index = pd.date_range(pd.Timestamp(origin + k0 * step), periods=nb,
+                          freq=freq, name=index_names.pop()
+                          if len(index_names) == 1 else None)
+    return pd.DataFrame(out, index=index).bfill()
+
+
+def _merged_names(df_list: list, keep_one: bool) -> list[list]:
+    """
+    Column names of each frame after merging them in turn, as pd.merge
+    suffixes them; with keep_one, duplicates contain %%SUFFIX%%
+    """
+    left, right = (None, '_%%SUFFIX%%') if keep_one else ('_x', '_y')
+    names = []
+    for df in df_list:
+        new = [str(x) for x in df.columns]
+        clash = set(n for ns in names for n in ns) & set(new)
+        if clash and left:
+            names = [[n + left if n in clash else n for n in ns]
+                     for ns in names]
+        new = [n + right if n in clash else n for n in new]
+        names.append(new)
+    return names
+
+
+def _no_bins(df_list: list, freq) -> str | None:
+    """Why frames cannot be binned on their own, None if they can"""
+    if not isinstance(freq, pd.offsets.Tick):
+        return f'{freq} is not a fixed period'
+    for df in df_list:
+        if not isinstance(df.index, pd.DatetimeIndex) or \
+                df.index.tz is not None or df.index.unit != 'ns':
+            return 'index is not a naive ns DatetimeIndex'
+        elif df.index.has_duplicates:
+            return 'index has duplicate timestamps'
+        elif not all(isinstance(x, str) for x in df.columns):
+            return 'column names are not strings'
+        elif not all(x.kind in 'biuf' for x in df.dtypes):
+            return 'columns are not numeric'
+    return None
+
+
+def _sync_merge(df_list: list, period_str: str, keep_one: bool,
+                agg: dict) -> pd.DataFrame:
+    """sync_and_resample by merging frames in turn"""
     df = df_list[0]
     if keep_one is False:
         suffixes = ('_x', '_y')
@@ -189,8 +339,19 @@ def sync_and_resample(df_list: list, period_str: str,
         df = pd.merge(df, df_list[i + 1], how='outer', left_index=True,
                       right_index=True, suffixes=suffixes)
     df = df[df.columns.drop(list(df.filter(regex='%%SUFFIX%%')))]
-    return df.dropna(how='all', axis=0).dropna(how='all', axis=1)\
-        .resample(period_str).mean().bfill()
+    r = df.dropna(how='all', axis=0).dropna(how='all', axis=1)\
+        .resample(period_str)
+    out = r.mean()
+    for k, how in agg.items():
+        if k not in out or how == 'mean':
+            continue
+        elif how == 'sum':
+            out[k] = r[k].sum(min_count=1)
+        elif how == 'last':
+            out[k] = r[k].last()
+        else:
+            raise ValueError(f'Invalid aggregation {how} for {k}')
+    return out.bfill()
 
 
 def check_datetime_overlap(datetimes: list, tol_mins: int = 30):
@@ -248,6 +409,104 @@ def infer_datetime(fn: str, dts: str, tz: int) -> dt.datetime:
         return dti - dt.timedelta(hours=tz)
 
 
+def join_columns(cols: list, sep: str = ' ') -> pd.Series:
+    """
+    Joins columns into one string column, e.g. the Time_p# parts of a split
+    datetime. Values are cast to the common dtype of all the columns first,
+    the same as joining rows of the concatenated matrix, so ints become
+    floats if any column is float, &c.
+
+    :param cols: list of series (or arrays) of equal length
+    :param sep: separator between the parts
+
+    :returns: series of joined strings, index from the first column
+    """
+    index = getattr(cols[0], 'index', None)
+    dtype = np.result_type(*[np.asarray(x).dtype for x in cols])
+    parts = [pd.Series(np.asarray(x, dtype=dtype), index=index).astype(str)
+             for x in cols]
+    if len(parts) == 1:
+        return parts[0]
+    return parts[0].str.cat(parts[1:], sep=sep)
+
+
+def infer_dt_format(fn: str, dts: pd.Series, sample: int = 10) -> tuple:
+    """
+    Infers the datetime format of a series of strings from a sample, with the
+    filename datetime as anchor; month first, then day first, then with the
+    same decimal fallback as infer_datetime.
+
+    :param fn: filename
+    :param dts: series of datetime strings
+    :param sample: number of strings used to infer the format
+
+    :returns: (format, fix) where fix says the decimal fallback is needed;
+    format is None if it could not be inferred, and infer_datetime_series
+    then parses each row as infer_datetime does
+    """
+    sdt = fn_datetime(fn)
+    # Sample of non-blank strings, so a blank first row does not decide it
+    head = dts.dropna().astype(str)
+    head = head[~head.str.strip().isin(['', 'nan', 'NaT'])].head(sample)
+    for fix in [False, True]:
+        x = _fix_decimal(head) if fix else head
+        for dayfirst in [False, True]:
+            f = guess_datetime_format(x.iloc[0], dayfirst=dayfirst) \
+                if len(x) else None
+            if f is None:
+                continue
+            t = pd.to_datetime(x, format=f, errors='coerce')
+            if t.notna().all() and not ((sdt - t) > pd.Timedelta(days=1))\
+                    .any():
+                log.debug('Inferred dt format %s for %s', f, fn)
+                return f, fix
+    log.debug('Could not infer dt format of %s', fn)
+    return None, False
+
+
+def _fix_decimal(s: pd.Series) -> pd.Series:
+    """Space before the decimal part to a point, as infer_datetime does"""
+    return s.str.replace(r' (\d+)$', r'.\1', regex=True)
+
+
+def infer_datetime_series(fn: str, dts: pd.Series, tz: int | None,
+                          fmt: tuple | None = None) -> pd.Series:
+    """
+    Vectorised infer_datetime. The format is inferred once (infer_dt_format)
+    and applied to the whole series; rows which do not parse with it, or are
+    more than a day after the filename datetime, go through infer_datetime
+    one by one.
+
+    :param fn: filename
+    :param dts: series of datetime strings in rando format
+    :param tz: timezone (e.g. +2, -2, &c)
+    :param fmt: result of infer_dt_format to reuse, e.g. between chunks of
+    one file; inferred from dts if None
+
+    :returns: series of datetimes, same index as dts
+    """
+    s = raw = dts.astype(str)
+    if fmt is None:
+        fmt = infer_dt_format(fn, s)
+    fmt, fix = fmt
+    if fmt is None:
+        out = pd.Series(pd.NaT, index=s.index, dtype='datetime64[ns]')
+    else:
+        if fix:
+            s = _fix_decimal(s)
+        out = pd.to_datetime(s, format=fmt, errors='coerce', cache=True)
+    slow = out.isna() | ((fn_datetime(fn) - out) > pd.Timedelta(days=1))
+    if slow.any():
+        log.debug('Parsing %i of %i datetimes per row', slow.sum(), len(s))
+        out = out.astype(object)
+        out[slow] = [infer_datetime(fn, x, None) for x in raw[slow]]
+        out = pd.to_datetime(out)
+    if not tz:
+        return out
+    else:
+        return out - pd.Timedelta(hours=tz)
+
+
 def fn_datetime(fn: list or str) -> dt.datetime or pd.Timestamp:
     """
     Retrieves datetime from filename in standard format
@@ -268,6 +527,23 @@ def fn_datetime(fn: list or str) -> dt.datetime or pd.Timestamp:
         return dti
 
 
+def fn_datetimes(fn: list) -> pd.DatetimeIndex:
+    """
+    Vectorised fn_datetime for many filenames; names which are not in the
+    standard format give NaT rather than raising
+
+    :param fn: list of filenames (abs paths ok)
+
+    :return: datetime index in the order of fn
+    """
+    parts = pd.Series([os.path.split(f)[-1] for f in fn], dtype=object)\
+        .str.split('_')
+    dts = parts.str[-3].str.cat(parts.str[-2], sep='_')\
+        .where(parts.str.len() >= 3)
+    return pd.DatetimeIndex(pd.to_datetime(dts, format='%Y%m%d_%H%M%S%f',
+                                           errors='coerce'))
+
+
 def to_string(s) -> str:
     """
     Convert object to string
@@ -308,9 +584,14 @@ def df_to_dict(df: pd.DataFrame, inc_index: bool = True) -> dict:
     :returns: dictionary with standard type keys
     """
 
-    md = df.to_dict(orient='list')
-    for key in md:
-        md[key] = np.matrix(md[key]).T
+    md = {}
+    for key in df.columns:
+        col = df[key]
+        # Numeric columns skip the round trip through python lists
+        if col.dtype.kind in 'biuf':
+            md[key] = np.matrix(col.to_numpy()).T
+        else:
+            md[key] = np.matrix(col.tolist()).T
     if inc_index == True:
         md['Time'] = df.index
     elif inc_index == False:
@@ -344,14 +625,14 @@ def check_valid_cols(iss: dict, dkey: str = 'cols'):
 
     _finditem(iss, dkey)
     fields = [i for s in fields for i in s if not isinstance(s, str)]
-    vf = [x['name'] for x in ch.getval('valid_flags')]
+    vf = fl.get_index().by_name
     for flag in fields:
         if isinstance(flag, list):
             flag = flag[0]
         if flag not in vf:
             ch.getconf('valid_flags')
             raise ReferenceError('Data flag \'%s\' is not valid' % flag)
-    print("All flags valid")
+    log.debug("All flags valid")
 
 
 def get_instrument_sn(fn: str) -> str:
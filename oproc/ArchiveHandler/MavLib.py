@@ -5,160 +5,477 @@ Library of tools to handle mavlink log data in raw data processing.
 from ..ArchiveHandler import ImportLib as im
 from ..ArchiveHandler import Utilities as utils
 from .. import ConfigHandler as ch
-from .. import newprint
 
 from pymavlink import mavutil
+from dateutil import tz as dtz
+from collections import Counter
 import json
+import bisect
+import itertools
+import re
 import array
-import warnings
-import datetime as dt
+import numpy as np
 import pandas as pd
-import subprocess
+import h5py
 import os.path
+import time
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
+# Message types that are not flight data
+EXCLUDE_MESSAGES = ['BAD_DATA', 'FMT', 'PARM', 'MULT', 'FMTU']
 
-def read_mavlink_log(log_path: str, message_names: dict) -> dict:
+# Whitespace and separators between JSON array elements
+_json_ws = re.compile(r'\s*')
+_json_sep = re.compile(r'[\s,]*')
+
+
+def iss_messages(data: dict) -> dict:
+    """
+    Message names and fields from the "data" entry of an FC iss record
+
+    :param data: e.g. {"ATT": [["Pitch", "deg"], ...], ...}
+
+    :return: e.g. {"ATT": ["Pitch", ...], ...}
+    """
+    return dict([(k, [i[0] if isinstance(i, list) else i for i in v])
+                 for k, v in data.items()])
+
+
+def messages_from_iss(iss_names: list | str,
+                      types: tuple = ('FC', 'FC Proc')) -> dict:
+    """
+    Union of the message names and fields used by the FC records of one or
+    more iss files; the whitelist for log conversion.
+
+    :param iss_names: iss file name(s) in the "iss_path" directory
+    :param types: iss data types which are FC logs
+
+    :return: message spec as returned by iss_messages
+    """
+    messages = {}
+    for name in im.to_list(iss_names):
+        issd = im.get_iss_json(name)
+        for rec in issd.values():
+            if rec['type'] not in types:
+                continue
+            for k, v in iss_messages(rec['data']).items():
+                messages[k] = messages.get(k, []) + \
+                    [x for x in v if x not in messages.get(k, [])]
+    if not messages:
+        raise ValueError(f'No {types} records in iss {iss_names}')
+    log.debug('message whitelist %s', messages)
+    return messages
+
+
+def read_mavlink_log(log_path: str, message_names: dict,
+                     t: str = 'FC', window: tuple | None = None) -> dict:
     """
     A function to read a mavlink log, with specified message and data names,
-    into arrays. Calls the "mavlogdump.py" file as a subprocess and therefore
-    takes a long time to run; function depreciated in future versions, in
-    favour of json.
+    into arrays. The log is parsed in-process; messages of other types are
+    skipped by the parser.
 
     :param log_path: The path to the mavlink '.log' file
     :param message_names: Specification of message names
+    :param t: data type of the log, for relative paths
+    :param window: (start, end) datetimes; only the messages between are
+    kept, and parsing stops once every type is past the end
 
     :return: The synchronised and resampled data frame.
     """
-    def _proc_fc_row(fc_row, params):
-        time = dt.datetime.strptime(fc_row[:22], '%Y-%m-%d %H:%M:%S.%f')
-        output = []
-        fc_row = fc_row.split(',')
-        for param in params:
-            for fc_part in fc_row:
-                label = fc_part.split(':')[0]
-                if param.replace(' ', '') == label.replace(' ', ''):
-                    output.append(float(fc_part.split(':')[-1]))
+    log_path = utils.get_log_path(log_path, t)
+    t0 = time.perf_counter()
+    mlog = mavutil.mavlink_connection(log_path, robust_parsing=True,
+                                      dialect='ardupilotmega')
+    buffers = dict([(m, _ColumnBuffer(v)) for m, v in message_names.items()])
+    m_types = list(message_names)
+    tw = None if window is None else \
+        (_to_unix(window[0]), _to_unix(window[-1]))
+    done = set()
+    while True:
+        m = mlog.recv_match(type=m_types)
+        if m is None:
+            break
+        try:
+            buf = buffers[m.get_type()]
+        except KeyError:
+            continue
+        ts = getattr(m, '_timestamp', 0.0)
+        if tw is not None and not tw[0] <= ts <= tw[1]:
+            if ts > tw[1]:
+                done.add(m.get_type())
+                if len(done) == len(buffers):
                     break
-        return time, output
-
-    warnings.warn('Feature will be discontinued in future versions',
-                  category=DeprecationWarning)
-
-    mav_path = os.path.join(os.path.dirname(os.path.realpath(__file__)),
-                            '../mavlogdump.py')
-    proc = subprocess.Popen(['python', mav_path, "--types",
-                             ','.join(message_names.keys()), log_path],
-                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    fd_out = proc.communicate()[0].decode("utf-8")
-    fd_out = fd_out.split('\n')
-    fd = {}
-    for mess in message_names:
-        fd_list = []
-        for r in fd_out:
-            if mess in r:
-                fd_list.append(r)
-        fd[mess] = fd_list
+            continue
+        buf.append(ts, [getattr(m, k, None) for k in buf.fields])
+    t1 = time.perf_counter()
+    out = _frames_to_dict(buffers, log_path)
+    log.info('Read %s in %.2f s (parse %.2f s, resample %.2f s)',
+             os.path.split(log_path)[-1], time.perf_counter() - t0, t1 - t0,
+             time.perf_counter() - t1)
+    return out
 
-    fc_dict = {}
-    for mess in message_names:
-        fc_list = []
-        fc_time = []
-        for row in fd[mess]:
-            fc_time_row, proc_row = _proc_fc_row(row, message_names[mess])
-            fc_list.append(proc_row)
-            fc_time.append(fc_time_row)
-        fc_dict[mess] = pd.DataFrame(fc_list, columns=message_names[mess],
-                                     index=fc_time)
 
-    df = im.sync_and_resample(list(fc_dict.values()), '0.1S')
+class _ColumnBuffer(object):
+    """
+    Growable float64 columns for the wanted fields of one message type.
+    Missing and non-numeric values are left as NaN.
+
+    :param fields: field names, in column order
+    :param size: initial capacity in messages
+    """
+
+    def __init__(self, fields: list, size: int = 1024):
+        self.fields = list(fields)
+        self.n = 0
+        size = max(int(size), 1)
+        self.ts = np.empty(size)
+        self.cols = np.full((len(self.fields), size), np.nan)
+
+    def append(self, timestamp: float, values: list):
+        """Adds one message; values are in the order of self.fields"""
+        if self.n == self.ts.shape[0]:
+            self.__grow()
+        i = self.n
+        self.ts[i] = timestamp
+        for j, v in enumerate(values):
+            try:
+                self.cols[j, i] = v
+            except (TypeError, ValueError):
+                pass
+        self.n = i + 1
 
+    def __grow(self):
+        size = self.ts.shape[0]
+        self.ts = np.concatenate([self.ts, np.empty(size)])
+        self.cols = np.concatenate([self.cols,
+                                    np.full(self.cols.shape, np.nan)], axis=1)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Columns as a data frame with a datetime index named timestamp"""
+        n = self.n
+        df = pd.DataFrame(dict(zip(self.fields, self.cols[:, :n])),
+                          index=timestamps_to_index(self.ts[:n]))
+        df.index.name = 'timestamp'
+        return df
+
+
+def _frames_to_dict(buffers: dict, source: str) -> dict:
+    """Turns per-message column buffers into the resampled output dict"""
+    fc_dict = {}
+    for m, buf in buffers.items():
+        log.info('%s: %i %s messages', os.path.split(source)[-1], buf.n, m)
+        if not buf.n:
+            log.warning('No %s messages in %s', m, source)
+        fc_dict[m] = buf.to_frame()
+    df = im.sync_and_resample(list(fc_dict.values()), '0.1S')
     return im.df_to_dict(df)
 
 
-def read_json_log(log_path: str, message_names: dict) -> dict:
+def iter_json_array(f, chunk_size: int = 1 << 20, start: int | None = None,
+                    offsets: bool = False):
+    """
+    Yields the elements of a top-level JSON array one at a time, reading the
+    file in chunks, so memory use does not depend on the file size.
+
+    :param f: file object opened in text mode
+    :param chunk_size: characters read per chunk
+    :param start: offset of an element to start at, as yielded with
+    offsets=True; needs a file from _open_json
+    :param offsets: yield (offset, element) tuples
+
+    :raise ValueError: if the file is not a JSON array
+    """
+    dec = json.JSONDecoder()
+    if start is None:
+        base = 0
+        buf = f.read(chunk_size)
+        pos = _json_ws.match(buf).end()
+        while pos == len(buf):
+            more = f.read(chunk_size)
+            if not more:
+                break
+            buf = buf + more
+            pos = _json_ws.match(buf, pos).end()
+        if buf[pos:pos + 1] != '[':
+            raise ValueError(f'{getattr(f, "name", f)} is not a JSON array')
+        pos = pos + 1
+    else:
+        f.seek(start)
+        base = start
+        buf = f.read(chunk_size)
+        pos = 0
+    eof = False
+    while True:
+        pos = _json_sep.match(buf, pos).end()
+        if pos == len(buf):
+            if eof:
+                raise ValueError('unterminated JSON array')
+            more = f.read(chunk_size)
+            eof = not more
+            base = base + pos
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        if buf[pos] == ']':
+            return
+        try:
+            obj, end = dec.raw_decode(buf, pos)
+            err = None
+        except json.JSONDecodeError as e:
+            end, err = None, e
+        # An element that fails, or ends the buffer, may be cut off
+        if (end is None) or (end == len(buf) and not eof):
+            more = f.read(chunk_size)
+            if not more:
+                if err is not None:
+                    raise err
+                eof = True
+            base = base + pos
+            buf = buf[pos:] + more
+            pos = 0
+            continue
+        yield (base + pos, obj) if offsets else obj
+        pos = end
+        if pos > chunk_size:
+            base = base + pos
+            buf = buf[pos:]
+            pos = 0
+
+
+def _open_json(path: str):
+    """
+    Opens a json log for reading. The logs are ASCII (json.dumps escapes
+    anything else), and latin-1 keeps one character per byte, so element
+    offsets are byte offsets which can be seeked to.
+    """
+    return open(path, 'r', encoding='latin-1')
+
+
+def _to_unix(t) -> float:
+    """Inverse of timestamps_to_index for one (naive local) datetime"""
+    t = pd.Timestamp(t)
+    if t.tzinfo is None:
+        t = t.tz_localize(dtz.tzlocal())
+    return t.timestamp()
+
+
+def _file_stamp(path: str) -> dict:
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def index_path(log_path: str) -> str:
+    """Path of the hidden offset index sidecar of a log"""
+    head, tail = os.path.split(log_path)
+    return os.path.join(head, f'.{tail}.idx')
+
+
+def build_json_index(log_path: str, every: int = 1000) -> dict:
+    """
+    Builds the offset index of a json log, which records the timestamp and
+    file offset of every n-th message of each type, and saves it as a
+    sidecar next to the log.
+
+    :param log_path: The path to the json file
+    :param every: index every n-th message of each type
+
+    :return: the index
+    """
+    log_path = utils.get_log_path(log_path, 'FC Proc')
+    counts = {}
+    types = {}
+    with _open_json(log_path) as f:
+        for off, x in iter_json_array(f, offsets=True):
+            meta = x['meta']
+            n = counts.get(meta['type'], 0)
+            if n % every == 0:
+                types.setdefault(meta['type'], []).append(
+                    [meta['timestamp'], off])
+            counts[meta['type']] = n + 1
+    idx = {'source': _file_stamp(log_path), 'every': every,
+           'counts': counts, 'types': types}
+    with utils.atomic_output(index_path(log_path)) as tmp:
+        with open(tmp, 'w') as f:
+            json.dump(idx, f)
+    log.info('Indexed %s', log_path)
+    return idx
+
+
+def get_json_index(log_path: str, every: int = 1000) -> dict:
+    """
+    Returns the offset index of a json log, (re)building it if there is no
+    sidecar or the log has changed since it was built.
+
+    :param log_path: The path to the json file
+    :param every: index every n-th message of each type, if building
+    """
+    log_path = utils.get_log_path(log_path, 'FC Proc')
+    try:
+        with open(index_path(log_path), 'r') as f:
+            idx = json.load(f)
+        if idx['source'] == _file_stamp(log_path):
+            return idx
+        log.debug('Index of %s is stale', log_path)
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+    return build_json_index(log_path, every)
+
+
+def _index_span(idx: dict, types: list, t0: float, t1: float) -> tuple:
+    """
+    File offsets to read between to get all the messages of the types
+    between unix times t0 and t1; the end offset is None for EOF.
+    """
+    starts, stops = [], []
+    for m in types:
+        entries = idx['types'].get(m)
+        if not entries:
+            continue
+        ts = [x[0] for x in entries]
+        i = bisect.bisect_right(ts, t0) - 1
+        starts.append(entries[max(i, 0)][1])
+        j = bisect.bisect_right(ts, t1)
+        stops.append(entries[j][1] if j < len(entries) else None)
+    if not starts:
+        return None, None
+    return min(starts), None if None in stops else max(stops)
+
+
+def read_json_log(log_path: str, message_names: dict,
+                  stream: bool = True, window: tuple | None = None) -> dict:
     """
     A function to read a mavlink log, with specified message and data names,
-    into arrays.
+    into arrays. The messages are grouped by type in a single pass over the
+    log.
 
     :param log_path: The path to the json file
     :param message_names: Specification of message
+    :param stream: decode the log one message at a time, keeping only the
+    wanted messages in memory (True), or load the whole log first (False)
+    :param window: (start, end) datetimes; only the messages between are
+    read, using the offset index to seek to them when streaming
 
     :return: The synchronised and resampled data frame
     """
-    # Load JSON
     log_path = utils.get_log_path(log_path, 'FC Proc')
-    with open(log_path, 'r') as f:
-        log_dict = json.load(f)
-    fc_dict = {}
-    for m in message_names:
-        # Get message names with listcomp!
-        data = [x for x in log_dict if m == x['meta']['type']]
-        # Merge meta and data, I love listcomp!
-        data = [x['data'] | {'timestamp': x['meta']['timestamp']}
-                for x in data]
-        # Timestoomp --> dootime
-        data = [x | {'timestamp': dt.datetime.fromtimestamp(x['timestamp'])}
-                for x in data]
-        # Format as dataframe with columns, and a timestamp index for syncing
-        fc_dict[m] = pd.DataFrame(data).set_index('timestamp')
-        # Remove unwanted data
-        rm_list = list(fc_dict[m].columns.values)
-        [rm_list.remove(x) for x in message_names[m]]
-        fc_dict[m] = fc_dict[m].drop(rm_list, axis=1)
+    t0 = time.perf_counter()
+    tw = None if window is None else \
+        (_to_unix(window[0]), _to_unix(window[-1]))
+    if stream:
+        buffers = dict([(m, _ColumnBuffer(v))
+                        for m, v in message_names.items()])
+        start, stop = None, None
+        if tw is not None:
+            start, stop = _index_span(get_json_index(log_path),
+                                      list(message_names), *tw)
+        with _open_json(log_path) as f:
+            records = iter_json_array(f, start=start, offsets=True)
+            if stop is not None:
+                records = itertools.takewhile(lambda x: x[0] < stop, records)
+            _bucket((x for _, x in records), buffers, tw)
+        # Decoding is part of grouping when streaming
+        t1, t2 = t0, time.perf_counter()
+    else:
+        with open(log_path, 'r') as f:
+            log_dict = json.load(f)
+        t1 = time.perf_counter()
+        # Count first (cheap), so the columns are allocated once
+        counts = Counter(x['meta']['type'] for x in log_dict)
+        buffers = dict([(m, _ColumnBuffer(v, counts.get(m, 0)))
+                        for m, v in message_names.items()])
+        _bucket(log_dict, buffers, tw)
+        del log_dict
+        t2 = time.perf_counter()
+    out = _frames_to_dict(buffers, log_path)
+    log.info('Read %s in %.2f s (load %.2f s, group %.2f s, resample '
+             '%.2f s)', os.path.split(log_path)[-1],
+             time.perf_counter() - t0, t1 - t0, t2 - t1,
+             time.perf_counter() - t2)
+    return out
 
-    df = im.sync_and_resample(list(fc_dict.values()), '0.1S')
 
-    return im.df_to_dict(df)
+def _bucket(records, buffers: dict, tw: tuple | None = None):
+    """
+    Appends each json log record to the buffer for its type, if any, and if
+    it is in the unix time window tw
+    """
+    for x in records:
+        meta = x['meta']
+        try:
+            buf = buffers[meta['type']]
+        except KeyError:
+            continue
+        if tw is not None and not tw[0] <= meta['timestamp'] <= tw[1]:
+            continue
+        data = x['data']
+        buf.append(meta['timestamp'], [data.get(k) for k in buf.fields])
 
 
-def log_to_json(fc_log: str, in_dir: str = 'FC', out_dir: str = 'FC Proc'):
+def log_to_json(fc_log: str, in_dir: str = 'FC', out_dir: str = 'FC Proc',
+                messages: dict | None = None):
+    """
+    Converts mavlink logs to json lists of messages
+
+    :param fc_log: log file name(s), abs or rel to in_dir
+    :param in_dir: data type of the input logs
+    :param out_dir: data type of the output files
+    :param messages: only keep these message types and fields, e.g. from
+    messages_from_iss; all messages and fields if None
+
+    :return: list of the files written
+    """
 
     # Get path for outputs
     base = utils.get_log_path(None, out_dir)
 
     # Create path if it does not exist
     if not os.path.exists(base):
-        print('Creating data directory structure at base path %s'
-              % ch.getval('base_data_path'))
+        log.info('Creating data directory structure at base path %s',
+                 ch.getval('base_data_path'))
         utils.make_dir_structure()
 
     # Convert input path to list if it is not
     fc_log = im.to_list(fc_log)
+    out_files = []
 
     # Loop through input logs
-    for log in fc_log:
+    for fn in fc_log:
 
         # Convert to abs path
-        log = utils.get_log_path(log, in_dir)
-        out_file = os.path.join(base, os.path.split(log)[-1]
+        fn = utils.get_log_path(fn, in_dir)
+        out_file = os.path.join(base, os.path.split(fn)[-1]
                                 .replace('.log', '.json'))
-        mlog = mavutil.mavlink_connection(log, robust_parsing=True,
+        mlog = mavutil.mavlink_connection(fn, robust_parsing=True,
                                           dialect='ardupilotmega')
 
         db = []
-        exclude = ['BAD_DATA', 'FMT', 'PARM', 'MULT', 'FMTU']
+        m_types = list(messages) if messages else None
         # Main proc loop
         while True:
-            # Get mavlink log line
-            m = mlog.recv_match()
+            # Get mavlink log line, unwanted types are skipped by the parser
+            m = mlog.recv_match(type=m_types)
             # Break if empty; the logging is complete
             if m is None:
                 break
             # Get message type for later
             m_type = m.get_type()
             # Skip over bad data
-            if m_type in exclude:
+            if m_type in EXCLUDE_MESSAGES:
                 continue
             # Grab the timestamp.
             timestamp = getattr(m, '_timestamp', 0.0)
-            # Format our message as a Python dict
-            data = m.to_dict()
-            # Remove the mavpackettype value as we specify that later.
-            del data['mavpackettype']
+            if messages:
+                # Project onto the wanted fields only
+                data = dict([(k, getattr(m, k, None))
+                             for k in messages[m_type]])
+            else:
+                # Format our message as a Python dict
+                data = m.to_dict()
+                # Remove the mavpackettype value as we specify that later.
+                del data['mavpackettype']
             # Prepare the message as a single object
             meta = {"type": m_type, "timestamp": timestamp}
             # convert any array.array into lists:
@@ -171,7 +488,179 @@ def log_to_json(fc_log: str, in_dir: str = 'FC', out_dir: str = 'FC Proc'):
                     data[key] = im.to_string(data[key])
             db.append({"meta": meta, "data": data})
 
-        with open(out_file, mode='a') as out_stream:
-            out_stream.write(json.dumps(db))
+        with utils.atomic_output(out_file) as tmp:
+            with open(tmp, mode='w') as out_stream:
+                out_stream.write(json.dumps(db))
+
+        log.info('Created %s', out_file)
+        out_files.append(out_file)
+
+    return out_files
+
+
+def timestamps_to_index(ts) -> pd.DatetimeIndex:
+    """
+    Converts mavlink unix timestamps to a naive local time index, the same as
+    datetime.fromtimestamp does per value, but vectorised.
+
+    :param ts: array of unix timestamps in seconds
+
+    :return: datetime index
+    """
+    return pd.to_datetime(np.asarray(ts, dtype=float), unit='s', utc=True)\
+        .tz_convert(dtz.tzlocal()).tz_localize(None)
+
+
+class _ColumnWriter(object):
+    """
+    Buffers the fields of one message type and appends them to resizable
+    datasets in an h5 group, one dataset per field plus "timestamp".
+    """
+
+    def __init__(self, grp: h5py.Group, batch: int,
+                 fields: list | None = None):
+        self.grp = grp
+        self.batch = batch
+        self.names = fields
+        self.fields = None
+        self.buf = {}
+        self.n = 0
+
+    def add(self, m, timestamp: float):
+        if self.fields is None:
+            self.__init_fields(m)
+        self.buf['timestamp'].append(timestamp)
+        for k in self.fields:
+            self.buf[k].append(getattr(m, k))
+        if len(self.buf['timestamp']) >= self.batch:
+            self.flush()
+
+    def __init_fields(self, m):
+        # Only numeric scalars are stored; types are fixed by the first
+        # message, mavlink message formats do not change within a log
+        self.fields = {}
+        for k in self.names if self.names else m.get_fieldnames():
+            v = getattr(m, k, None)
+            if isinstance(v, int):
+                self.fields[k] = np.int64
+            elif isinstance(v, float):
+                self.fields[k] = np.float64
+            else:
+                log.debug('%s.%s is not numeric, skipping', m.get_type(), k)
+        self.buf = dict([(k, []) for k in ['timestamp', *self.fields]])
+        for k, t in [('timestamp', np.float64), *self.fields.items()]:
+            self.grp.create_dataset(k, (0,), maxshape=(None,), dtype=t,
+                                    chunks=(self.batch,))
 
-        print('Created %s' % out_file)
+    def flush(self):
+        n = len(self.buf.get('timestamp', []))
+        if not n:
+            return
+        for k, v in self.buf.items():
+            ds = self.grp[k]
+            ds.resize((self.n + n,))
+            ds[self.n:] = np.asarray(v, dtype=ds.dtype)
+            v.clear()
+        self.n = self.n + n
+
+
+def log_to_columns(fc_log: str, in_dir: str = 'FC',
+                   out_dir: str = 'FC Proc', batch: int = 8192,
+                   messages: dict | None = None):
+    """
+    Converts mavlink logs to columnar h5 files, with one group per message
+    type holding a "timestamp" dataset and one dataset per numeric field.
+    Messages are streamed to disk in batches, so the whole log is never held
+    in memory.
+
+    :param fc_log: log file name(s), abs or rel to in_dir
+    :param in_dir: data type of the input logs
+    :param out_dir: data type of the output files
+    :param batch: messages buffered per type before writing
+    :param messages: only keep these message types and fields, e.g. from
+    messages_from_iss; all messages and numeric fields if None
+
+    :return: list of the files written
+    """
+    base = utils.get_log_path(None, out_dir)
+    if not os.path.exists(base):
+        log.info('Creating data directory structure at base path %s',
+                 ch.getval('base_data_path'))
+        utils.make_dir_structure()
+
+    out_files = []
+    for fn in im.to_list(fc_log):
+        fn = utils.get_log_path(fn, in_dir)
+        out_file = os.path.join(base, os.path.splitext(
+            os.path.split(fn)[-1])[0] + '.h5')
+        mlog = mavutil.mavlink_connection(fn, robust_parsing=True,
+                                          dialect='ardupilotmega')
+        writers = {}
+        m_types = list(messages) if messages else None
+        with utils.atomic_output(out_file) as tmp, \
+                h5py.File(tmp, 'w') as f:
+            while True:
+                m = mlog.recv_match(type=m_types)
+                if m is None:
+                    break
+                m_type = m.get_type()
+                if m_type in EXCLUDE_MESSAGES:
+                    continue
+                try:
+                    w = writers[m_type]
+                except KeyError:
+                    w = _ColumnWriter(f.create_group(m_type), batch,
+                                      messages[m_type] if messages else None)
+                    writers[m_type] = w
+                w.add(m, getattr(m, '_timestamp', 0.0))
+            for w in writers.values():
+                w.flush()
+        log.info('Created %s', out_file)
+        out_files.append(out_file)
+
+    return out_files
+
+
+def read_column_log(log_path: str, message_names: dict,
+                    window: tuple | None = None) -> dict:
+    """
+    Reads a columnar log written by log_to_columns. Only the requested message
+    types and fields are read from disk; missing message types give an empty
+    frame and missing fields are left out, with a warning.
+
+    :param log_path: The path to the h5 file
+    :param message_names: Specification of message
+    :param window: (start, end) datetimes; only the rows between are read
+
+    :return: The synchronised and resampled data frame
+    """
+    log_path = utils.get_log_path(log_path, 'FC Proc')
+    fc_dict = {}
+    with h5py.File(log_path, 'r') as f:
+        for m, fields in message_names.items():
+            try:
+                grp = f[m]
+            except KeyError:
+                log.warning('No %s messages in %s', m, log_path)
+                fc_dict[m] = _ColumnBuffer(fields).to_frame()
+                continue
+            missing = [k for k in fields if k not in grp]
+            if missing:
+                # Non-numeric fields are not written by log_to_columns
+                log.warning('No %s fields %s in %s', m, missing, log_path)
+            ts = grp['timestamp'][()]
+            sl = slice(None)
+            if window is not None:
+                sl = slice(np.searchsorted(ts, _to_unix(window[0]),
+                                           side='left'),
+                           np.searchsorted(ts, _to_unix(window[-1]),
+                                           side='right'))
+            idx = timestamps_to_index(ts[sl])
+            fc_dict[m] = pd.DataFrame(dict([(k, grp[k][sl]) for k in fields
+                                            if k not in missing]), index=idx)
+            fc_dict[m].index.name = 'timestamp'
+            log.debug('read %i %s messages', len(idx), m)
+
+    df = im.sync_and_resample(list(fc_dict.values()), '0.1S')
+
+    return im.df_to_dict(df)
@@ -1,11 +1,10 @@
 from ..GenericDataObjects.MatrixColumn import MatrixColumn
 from ..GenericDataObjects.DataStruct import DataStruct
 from numpy import matrix as mt
-from ... import newprint
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class ImportObject(DataStruct):
@@ -19,12 +18,12 @@ class ImportObject(DataStruct):
         col_dict = {}
         for k, v in dat.items():
             if isinstance(v, mt):
-                print("converting %s to matrix column" % k)
+                log.debug("converting %s to matrix column", k)
                 col_dict[k] = MatrixColumn(k, v, len(self))
             elif isinstance(v, MatrixColumn):
                 col_dict[k] = v
             else:
-                print("%s cannot be assigned to matrix column" % k)
+                log.debug("%s cannot be assigned to matrix column", k)
         self.col_dict = col_dict
 
         self._self_check()
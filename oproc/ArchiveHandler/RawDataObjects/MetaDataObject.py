@@ -3,11 +3,10 @@ raise DeprecationWarning
 import datetime as dt
 import os.path
 from .. import ImportLib as im
-from ... import newprint
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class MetaDataObject(object):
@@ -49,10 +48,10 @@ class MetaDataObject(object):
         self.ucass_serial_number = serial_number
         self.bin_boundaries_adc = bbs
         if cali_coeffs is None:
-            print("No calibration specifed, looking up from serial number")
+            log.info("No calibration specifed, looking up from serial number")
             self.cali_coeffs = \
                 im.get_ucass_calibration(self.ucass_serial_number)
-            print("Calibration found for %s" % self.ucass_serial_number)
+            log.info("Calibration found for %s", self.ucass_serial_number)
         else:
             self.cali_coeffs = cali_coeffs
 
@@ -1,31 +1,86 @@
 from .iss import iss
 from .. import Utilities as utils
-from ... import newprint
 from ... import ConfigHandler as ch
+from ...ConfigHandler import RunContext as rc
 from ...ProcHandler import ProcLib as pl
 from .. import ImportLib as im
 from .. import MavLib as mav
+from .. import FlagLib as fl
+from .. import CacheLib as cl
+from ... import ureg
 from ..GenericDataObjects.MatrixDict import MatrixDict as md
-from ..GenericDataObjects.MatrixDict import MatrixColumn as mc
 
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor,\
+    Executor
+import atexit
 import os.path
 import pandas as pd
-import warnings
 import numpy as np
+import logging
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
+
+# Log types read by MavLib
+FC_TYPES = ['.json', '.h5', '.log']
+# Fewer FC logs than this are read in threads even if processes are asked for
+PROCESS_MIN_FILES = 4
+
+# Worker process pool shared by RawFile.read calls, see process_pool
+_pool = {'key': None, 'ex': None}
+
+
+def process_pool(workers: int, ctx: rc.RunContext) -> ProcessPoolExecutor:
+    """
+    Worker process pool for reading FC logs, reused between reads. The
+    context snapshot is sent to the workers once, when the pool is made; a
+    different context or number of workers makes a new pool.
+
+    :param workers: number of processes
+    :param ctx: run context activated in the workers
+    """
+    key = (workers, ctx)
+    if _pool['key'] != key:
+        shutdown_pool()
+        _pool['ex'] = ProcessPoolExecutor(workers,
+                                          initializer=rc.worker_init,
+                                          initargs=(ctx.snapshot(),))
+        _pool['key'] = key
+    return _pool['ex']
+
+
+def shutdown_pool():
+    """Shuts down the shared worker process pool, if there is one"""
+    if _pool['ex'] is not None:
+        _pool['ex'].shutdown()
+    _pool['key'] = None
+    _pool['ex'] = None
+
+
+atexit.register(shutdown_pool)
 
 
 class RawFile(object):
     """
     This is essentially a wrapper for a raw data file(s). The file(s) is/are
     read only.
+
+    :param iss: import struct spec object
+    :param nc: return plain dicts instead of MatrixDicts if True
+    :param ctx: run context, defaults to the active context
+    :param chunksize: read csv/tab files in chunks of this many rows, to
+    bound memory for very large files; a "chunksize" key in a file's iss
+    record overrides this
+    :param cache: use the parsed raw file cache (see CacheLib)
     """
 
-    def __init__(self, iss: iss, nc: bool = False):
+    def __init__(self, iss: iss, nc: bool = False,
+                 ctx: rc.RunContext | None = None,
+                 chunksize: int | None = None, cache: bool = True):
         self.__fn = None
         self.__nc = nc
+        self.chunksize = chunksize
+        self.cache = cache
+        self.ctx = rc.current() if ctx is None else ctx
         self.iss = iss
         self.fn: list = [utils.get_log_path
                          (f, self.iss.dflags[f]['type']) if not
@@ -33,7 +88,7 @@ class RawFile(object):
                                                           ['type'])) else np.nan
                          for f in list(iss.dflags.keys())]
 
-        print(f'File check returns {bool(self)}')
+        log.debug('File check returns %s', bool(self))
 
     def __bool__(self):
         return self.__file_check()
@@ -42,8 +97,10 @@ class RawFile(object):
         return f'{self.fn} raw files'
 
     def __enter__(self):
-        self.__f = [open(f, 'r') if isinstance(f, str) \
-                    else np.nan for f in self.fn]
+        # Only csv/tab files are read through a handle
+        self.__f = [open(f, 'r') if isinstance(f, str) and
+                    self.__ext(k) in ['.csv', '.tab']
+                    else np.nan for k, f in zip(self.iss.dflags, self.fn)]
         return self
 
     def __exit__(self, type, val, trace):
@@ -53,77 +110,139 @@ class RawFile(object):
             except AttributeError:
                 pass
 
-    def read(self) -> dict[md]:
+    def read(self, window: tuple | None = None, workers: int | None = None,
+             processes: bool = False,
+             executor: Executor | None = None) -> dict[md]:
+        """
+        Reads the files
+
+        :param window: (start, end) datetimes; FC logs are only read between
+        these, seeking via the log offset index where possible
+        :param workers: parse up to this many files at once, in threads
+        :param processes: parse FC logs (json/h5/log) in worker processes
+        instead of threads, for the parts which hold the GIL; the processes
+        are kept for later reads (see process_pool), and threads are used
+        when there are fewer than PROCESS_MIN_FILES logs to read
+        :param executor: executor for the FC logs instead of the shared
+        process pool, e.g. one the caller keeps for a whole campaign; its
+        workers must have the run context activated
+
+        :return: dict of the data of each file, in iss order
+        """
         #TODO: pass separator into read function separately for rows and cols,
         #this is a silly way of doing it and legacy
         if not self.__file_check():
             raise RuntimeError(f"File check is {bool(self)}")
         iss = self.iss.dflags
-        data = {}
-        for k, f in zip(iss, self.__f):
-            try:
-                timezone = iss[k]["timezone"]
-            except KeyError:
-                timezone = None
+        jobs = []
+        for k, f, fn in zip(iss, self.__f, self.fn):
             if isinstance(k, str):
-                print("Processing file %s" % k)
-                print(iss[k]['data'])
+                log.info("Processing file %s", k)
+                log.debug("%s", iss[k]['data'])
             else:
-                print("No file of type %s for measurement" % iss[k]['type'])
+                log.warning("No file of type %s for measurement",
+                            iss[k]['type'])
                 continue
             try:
                 lt = iss[k]['ext']
             except KeyError:
-                print("inferring log type, could lead to errors; code is shit\
-                      skill issue &c")
+                log.warning("inferring log type, could lead to errors; code "
+                            "is shit skill issue &c")
                 lt = utils.infer_log_type(k)
-            if lt == '.json':
-                messages = dict([(k, [i[0] if isinstance(i, list)
-                                      else i for i in v])
-                                 for k, v in iss[k]['data'].items()])
-                data[k] = mav.read_json_log(k, messages)
-            elif lt == '.log':
-                warnings.warn('Attempting to parse FC .log file')
-                messages = dict([(k, [i[0] if isinstance(i, list)
-                                      else i for i in v])
-                                 for k, v in iss[k]['data'].items()])
-                data[k] = mav.read_mavlink_log(k, messages)
-            elif lt == '.csv':
-                proc = {}
-                tp = iss[k]['type']
-                for key in ['cols', 'srow', 'procrows']:
-                    try:
-                        proc[key] = iss[k]['data'][key]
-                    except KeyError:
-                        proc[key] = None
-                data[k] = self.__proc_cols(k, proc['cols'],
-                                           proc['srow'], tp, timezone)\
-                    | self.__proc_rows(f, proc['procrows'])
-            elif lt == '.tab':
-                proc = {}
-                tp = iss[k]['type']
-                for key in ['cols', 'srow', 'procrows']:
-                    try:
-                        proc[key] = iss[k]['data'][key]
-                    except KeyError:
-                        proc[key] = None
-                data[k] = self.__proc_cols(k, proc['cols'],
-                                           proc['srow'], tp, timezone,
-                                           sep='\t')\
-                    | self.__proc_rows(f, proc['procrows'], sep='\t')
-            else:
-                raise ValueError("Invalid log file extension %s" % lt)
-            print(f'imported data containing {data[k].keys()}')
+            jobs.append((k, f, lt, self.__cache_key(k, fn, window)))
 
+        # Cached files are not parsed
+        results = dict([(k, cl.get(key)) for k, _, _, key in jobs if key])
+        todo = [(k, f, lt) for k, f, lt, _ in jobs if results.get(k) is None]
+        n_fc = sum(lt in FC_TYPES for _, _, lt in todo)
+        pp = executor
+        if pp is None and processes and workers and \
+                n_fc >= PROCESS_MIN_FILES:
+            pp = process_pool(workers, self.ctx)
+        if pp is None and (not workers or workers < 2 or len(todo) < 2):
+            parsed = [self.__read_one(k, f, lt, window) for k, f, lt in todo]
+        else:
+            # Results are taken in iss order, so the first failing file in
+            # the iss raises, whichever finishes first
+            with ThreadPoolExecutor(max(1, workers or 1)) as tp:
+                futures = [pp.submit(_read_fc, k, lt, iss[k], window)
+                           if pp is not None and lt in FC_TYPES else
+                           tp.submit(self.__read_one, k, f, lt, window)
+                           for k, f, lt in todo]
+                parsed = [x.result() for x in futures]
+        keys = dict([(k, key) for k, _, _, key in jobs])
+        for (k, _, _), res in zip(todo, parsed):
+            results[k] = res
+            if keys[k]:
+                cl.put(keys[k], *res)
+
+        data = {}
+        for k, _, _, _ in jobs:
+            dk, units = results[k]
+            log.debug('imported data containing %s', dk.keys())
             if self.__nc == False:
-                data[k] = md(data[k] | {"date_time": im.fn_datetime(k)},
-                             unit_spec=self.iss.uspec)
-            elif self.__nc == True:
-                pass
+                data[k] = md(dk | {"date_time": im.fn_datetime(k)},
+                             unit_spec=self.iss.uspec | units, ctx=self.ctx)
             else:
-                print(f'value for nc value is invalid ({self.__nc})')
+                if self.__nc != True:
+                    log.warning('value for nc value is invalid (%s)',
+                                self.__nc)
+                data[k] = dk
         return data
 
+    def __cache_key(self, k, fn, window) -> str | None:
+        """Cache key of a file, None if the cache is not used"""
+        if not self.cache or not isinstance(fn, str):
+            return None
+        rec = self.iss.dflags[k]
+        try:
+            return cl.make_key(fn, rec, window=window, nc=self.__nc,
+                               chunksize=rec.get('chunksize',
+                                                 self.chunksize))
+        except OSError as e:
+            log.debug('Not caching %s: %s', k, e)
+            return None
+
+    def __read_one(self, k, f, lt, window) -> tuple:
+        """
+        Parses one file of the iss
+
+        :return: (data dict, units of columns already converted to output
+        units)
+        """
+        rec = self.iss.dflags[k]
+        if lt in FC_TYPES:
+            return _read_fc(k, lt, rec, window)
+        elif lt in ['.csv', '.tab']:
+            timezone = rec.get("timezone")
+            proc = {}
+            tp = rec['type']
+            sep = '\t' if lt == '.tab' else ','
+            for key in ['cols', 'srow', 'procrows']:
+                try:
+                    proc[key] = rec['data'][key]
+                except KeyError:
+                    proc[key] = None
+            cs = rec.get('chunksize', self.chunksize)
+            # Header rows first, then the data from the same handle; from
+            # the file start, as an earlier read leaves the handle at the end
+            f.seek(0)
+            rows, n_read, n_blank = self.__proc_rows(f, proc['procrows'],
+                                                     sep=sep)
+            dk, units = self.__proc_cols(k, proc['cols'], proc['srow'], tp,
+                                         timezone, sep=sep, chunksize=cs,
+                                         src=f, skip=n_read - n_blank)
+            return dk | rows, units
+        else:
+            raise ValueError("Invalid log file extension %s" % lt)
+
+    def __ext(self, k) -> str:
+        """Log type of the iss record k"""
+        try:
+            return self.iss.dflags[k]['ext']
+        except KeyError:
+            return os.path.splitext(k)[-1]
+
     def __file_check(self) -> bool:
         """Returns false if file is invalid or does not exist"""
         if not list(filter(None, [os.path.exists(f)
@@ -138,9 +257,19 @@ class RawFile(object):
             pass
         return True
 
-    def __proc_cols(self, fn, cols, s_row, t, tz, sep=','):
+    def __proc_cols(self, fn, cols, s_row, t, tz, sep=',', chunksize=None,
+                    src=None, skip=0):
+        """
+        Reads the data columns of a csv/tab file
+
+        :param src: open handle of the file to read on from, if any
+        :param skip: non-blank lines read from src, from the file start
+
+        :return: (data dict, units of columns already converted to output
+        units)
+        """
         if not cols:
-            return {}
+            return {}, {}
         fn = utils.get_log_path(fn, t)
         if not s_row:
             s_row = 0
@@ -148,62 +277,121 @@ class RawFile(object):
             s_row = int(s_row)
         names = [x[0] if isinstance(x, list) else x for x in cols if x != '']
         use_cols = [i for i, x in enumerate(cols) if x]
-        d_out = pd.read_csv(fn, header=s_row, names=names, usecols=use_cols,
-                            sep=sep)
         if not tz:
-            print("Assuming UTC")
+            log.debug("Assuming UTC")
         else:
             tz = int(tz)
-        if self.__nc == True:
-            df_dict = im.df_to_dict(d_out, inc_index=False)
+        if not hasattr(src, 'read'):
+            src = fn
+        elif s_row - skip >= 0:
+            # The header has not been read yet, carry on from here
+            s_row = s_row - skip
         else:
-            try:
-                d_out['Time'] = [im.infer_datetime(fn, x, tz) \
-                                 for x in d_out['Time']]
-                d_out = d_out.set_index(d_out['Time'])
-                d_out = d_out.drop('Time', axis=1)
-                df_dict = im.df_to_dict(d_out)
-            except KeyError:
-                ts = ch.getval('tag_suffix')
-                t_prts = pl.get_all_suffix(f'Time_p{ts}', d_out)
-                dlen = len(im.to_list(list(t_prts.values()))[0])
-                t_prts = {k: mc(k, np.matrix(v), dlen).__get__()\
-                          for k, v in t_prts.items()}
-                t_prts = np.concatenate(list(t_prts.values()), axis=1)
-                t_prts = [' '.join(str(idx) for idx in sub)\
-                                    for sub in t_prts.tolist()]
-                t_prts = [im.infer_datetime(fn, x, tz) for x in t_prts]
-                d_out["Time"] = t_prts
-                d_out = d_out.set_index(d_out['Time'])
-                cols_to_drop = d_out.columns\
-                        [d_out.columns.str.contains('Time')]
-                d_out = d_out.drop(cols_to_drop, axis=1)
-                df_dict = im.df_to_dict(d_out)
-        return df_dict
+            src.seek(0)
+        kwargs = dict(header=s_row, names=names, usecols=use_cols, sep=sep,
+                      engine='c')
+        if chunksize:
+            return self.__proc_chunks(fn, src, kwargs, int(chunksize), tz)
+        d_out = pd.read_csv(src, **kwargs)
+        if self.__nc == True:
+            return im.df_to_dict(d_out, inc_index=False), {}
+        t_str, drop = self.__time_strings(d_out)
+        d_out = d_out.set_index(pd.Index(
+            im.infer_datetime_series(fn, t_str, tz), name='Time'))
+        return im.df_to_dict(d_out.drop(drop, axis=1)), {}
+
+    def __proc_chunks(self, fn, src, kwargs, chunksize, tz):
+        """
+        Chunked __proc_cols; each chunk is time indexed and converted to
+        output units, then copied into columns preallocated from the line
+        count of the file. With nc, chunks are neither time indexed nor
+        converted, as in the unchunked read
+        """
+        n = max(utils.count_lines(fn) - kwargs['header'] - 1, 1)
+        fi = fl.get_index(self.ctx)
+        uspec = self.iss.uspec
+        units = {}
+        cols = {}
+        times = None if self.__nc else np.empty(n, dtype='datetime64[ns]')
+        fmt = None
+        i = 0
+        for chunk in pd.read_csv(src, chunksize=chunksize, **kwargs):
+            m = len(chunk)
+            if i + m > n:
+                # Only if the line count was short, e.g. quoted newlines
+                n = max(2 * n, i + m)
+                cols = dict([(k, _grow(v, n)) for k, v in cols.items()])
+                times = None if times is None else _grow(times, n)
+            if times is not None:
+                t_str, drop = self.__time_strings(chunk)
+                if fmt is None:
+                    fmt = im.infer_dt_format(fn, t_str)
+                times[i:i + m] = im.infer_datetime_series(fn, t_str, tz, fmt)\
+                    .to_numpy(dtype='datetime64[ns]')
+                chunk = chunk.drop(drop, axis=1)
+            for k in chunk.columns:
+                v = chunk[k].to_numpy()
+                flag = fi.template(k)
+                if not self.__nc and k in uspec and flag in fi.units and \
+                        uspec[k] != fi.units[flag] and v.dtype.kind in 'biuf':
+                    v = (v * ureg(uspec[k])).to(ureg(fi.units[flag]))\
+                        .magnitude
+                    units[k] = fi.units[flag]
+                if k not in cols:
+                    cols[k] = np.empty(n, dtype=v.dtype)
+                elif np.result_type(cols[k], v) != cols[k].dtype:
+                    cols[k] = cols[k].astype(np.result_type(cols[k], v))
+                cols[k][i:i + m] = v
+            i = i + m
+        log.debug('read %i rows from %s in chunks of %i', i, fn, chunksize)
+        df_dict = dict([(k, np.matrix(v[:i] if v.dtype.kind in 'biuf'
+                                      else v[:i].tolist()).T)
+                        for k, v in cols.items()])
+        if times is not None:
+            df_dict['Time'] = pd.DatetimeIndex(times[:i], name='Time')
+        return df_dict, units
+
+    def __time_strings(self, d_out) -> tuple:
+        """Time column, or joined Time_p# columns, and the columns to drop"""
+        if 'Time' in d_out.columns:
+            return d_out['Time'], ['Time']
+        ts = self.ctx.getval('tag_suffix')
+        t_prts = pl.get_all_suffix(f'Time_p{ts}', d_out)
+        return im.join_columns(list(t_prts.values())), \
+            list(d_out.columns[d_out.columns.str.contains('Time')])
 
     @staticmethod
-    def __proc_rows(f, proc_rows, sep=','):
+    def __proc_rows(f, proc_rows, sep=',') -> tuple:
+        """
+        Reads the header row values, reading the file only as far as the
+        last row needed, so data can be read on from the same handle
+
+        :return: (row values, lines read, blank lines among those read)
+        """
         if not proc_rows:
-            return {}
-        d_out = {}
-        d = f.readlines()
+            return {}, 0, 0
+        specs = {}
         for rn in proc_rows:
-            print(f'row is {rn}')
-            print(proc_rows[rn])
+            log.debug('row is %s: %s', rn, proc_rows[rn])
             try:
-                pr = int(proc_rows[rn]["row"])
-                d_out[rn] = d[pr].split(sep)[int(proc_rows[rn]["cols"]
-                                                 .split(':')[0]):
-                                             int(proc_rows[rn]["cols"]
-                                                 .split(':')[-1])]
+                specs[rn] = (int(proc_rows[rn]["row"]),
+                             proc_rows[rn]["cols"], False)
             except TypeError:
-                pr = int(proc_rows[rn][0]["row"])
-                d_out[rn] = d[pr].split(sep)[int(proc_rows[rn][0]["cols"]
-                                                 .split(':')[0]):
-                                             int(proc_rows[rn][0]["cols"]
-                                                 .split(':')[-1])]
+                specs[rn] = (int(proc_rows[rn][0]["row"]),
+                             proc_rows[rn][0]["cols"], True)
+        d = []
+        for _ in range(max(x[0] for x in specs.values()) + 1):
+            line = f.readline()
+            if not line:
+                break
+            d.append(line)
+        d_out = {}
+        for rn, (pr, cols, num) in specs.items():
+            d_out[rn] = d[pr].split(sep)[int(cols.split(':')[0]):
+                                         int(cols.split(':')[-1])]
+            if num:
                 d_out[rn] = [float(x) for x in d_out[rn]]
-        return d_out
+        return d_out, len(d), len([x for x in d if x in ['\n', '\r\n']])
 
     @property
     def fn(self) -> list:
@@ -212,7 +400,7 @@ class RawFile(object):
     @fn.setter
     def fn(self, val: list):
         for fn in val:
-            print(fn)
+            log.debug('%s', fn)
             if isinstance(fn, str):
                 pass
             elif np.isnan(fn):
@@ -220,3 +408,27 @@ class RawFile(object):
             elif not os.path.isabs(fn):
                 raise ValueError("must be abs path")
         self.__fn = val
+
+
+def _grow(a: np.ndarray, n: int) -> np.ndarray:
+    """Copies a into a new array of length n"""
+    out = np.empty(n, dtype=a.dtype)
+    out[:len(a)] = a
+    return out
+
+
+def _read_fc(k: str, lt: str, rec: dict, window: tuple | None) -> tuple:
+    """
+    Reads one FC log of an iss; module level so it can run in a worker
+    process
+
+    :return: (data dict, {})
+    """
+    messages = mav.iss_messages(rec['data'])
+    if lt == '.json':
+        return mav.read_json_log(k, messages, window=window), {}
+    elif lt == '.h5':
+        return mav.read_column_log(k, messages, window=window), {}
+    else:
+        return mav.read_mavlink_log(k, messages, rec['type'],
+                                    window=window), {}
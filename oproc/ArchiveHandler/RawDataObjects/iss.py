@@ -1,10 +1,9 @@
 from ... import ConfigHandler as ch
-from ... import newprint
-import re
+from .. import FlagLib as fl
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class iss(object):
@@ -41,23 +40,16 @@ class iss(object):
     def __check_valid_cols(self, iss: dict, dkey: str = 'cols'):
         fields = self.__finditem(iss, dkey)
         fields = [i for s in fields for i in s if not isinstance(s, str)]
-        vf = [x['name'] for x in ch.getval('valid_flags')]
-        for flag in fields:
-            if isinstance(flag, list):
-                flag = flag[0]
-            try:
-                tag_suffix = ch.getval("tag_suffix")
-                flag = flag.replace(re.search(r'(?=\d)\w+', flag).group(),\
-                                    tag_suffix)
-            except AttributeError:
-                pass
-            if flag not in vf:
+        fields = [x[0] if isinstance(x, list) else x for x in fields]
+        fi = fl.get_index()
+        for flag in fi.validate(fields):
+            if flag == '':
+                log.debug('Skipping column')
+            else:
                 ch.getconf('valid_flags')
-                if flag == '':
-                    print('Skipping column')
-                else:
-                    raise ReferenceError('Data flag \'%s\' is not valid' % flag)
-        print("All flags valid")
+                raise ReferenceError('Data flag \'%s\' is not valid'
+                                     % fi.template(flag))
+        log.debug("All flags valid")
 
     @property
     def dflags(self) -> dict:
@@ -4,18 +4,32 @@ with raw data maintenance goes here.
 """
 
 from .. import ConfigHandler as ch
-from .. import newprint
 from . import ImportLib as im
 
 import os.path
+import json
+import tempfile
+from contextlib import contextmanager
 from datetime import datetime
 import pandas as pd
 import datetime as dt
 import numpy as np
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
+
+# Process umask, for files written via atomic_output
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+INDEX_DIR = '.oproc_index'
+INDEX_VERSION = 1
+
+# Index tables already loaded by this process, keyed by directory
+_index = {}
+# match_raw_files results of this process, keyed by arguments
+_matches = {}
 
 
 def get_log_path(path: str | None, t: str) -> str:
@@ -44,12 +58,174 @@ def get_log_path(path: str | None, t: str) -> str:
         raise FileNotFoundError(f'Path {path} does not exist in structure')
 
 
+def list_dir(path: str) -> list[str]:
+    """
+    Lists a raw data directory, skipping hidden files (temp files, indexes,
+    manifests, &c. are dot-prefixed)
+
+    :param path: directory path
+    """
+    return [x for x in os.listdir(path) if not x.startswith('.')]
+
+
+@contextmanager
+def atomic_output(path: str):
+    """
+    Context manager yielding a hidden temp path next to path; the temp file
+    replaces path on success, and is removed on failure, so a crash never
+    leaves a partial output file. Each call gets its own temp file, so
+    concurrent writers of the same path do not clobber each other.
+
+    :param path: final output path
+    """
+    head, tail = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(prefix=f'.{tail}.', suffix='.part',
+                               dir=head or None)
+    os.close(fd)
+    try:
+        yield tmp
+        # mkstemp files are private; give the output the usual permissions
+        os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def count_lines(path: str, bufsize: int = 1 << 20) -> int:
+    """
+    Counts the lines in a file without decoding it
+
+    :param path: file path
+    :param bufsize: bytes read at a time
+    """
+    n = 0
+    with open(path, 'rb') as f:
+        while True:
+            buf = f.read(bufsize)
+            if not buf:
+                break
+            n = n + buf.count(b'\n')
+    return n
+
+
+def index_path(name: str) -> str:
+    """
+    Path of the persisted index of a directory, kept under "Raw"
+
+    :param name: index name (the raw type, for raw directories)
+    """
+    return os.path.join(ch.getval('base_data_path'), 'Raw', INDEX_DIR,
+                        f'{name}.json')
+
+
+def dir_index(path: str, name: str, parse=None) -> pd.DataFrame:
+    """
+    Sorted table of the files in a directory and their datetimes, with
+    columns "datetime", "fn", "size" and "mtime". The table is persisted with
+    index_path(name), and is only updated when the directory mtime changes;
+    only new or changed files are parsed when it is. Files whose names have
+    no datetime are left out of the table.
+
+    :param path: abs directory path
+    :param name: index name
+    :param parse: function from a list of filenames to a DatetimeIndex, NaT
+    where there is no datetime; default im.fn_datetimes
+
+    :return: table sorted by datetime
+    """
+    parse = im.fn_datetimes if parse is None else parse
+    dir_mtime = os.stat(path).st_mtime_ns
+    try:
+        if _index[path][0] == dir_mtime:
+            return _index[path][1]
+    except KeyError:
+        pass
+
+    # Persisted index, if there is one and it was made with this version
+    ipath = index_path(name)
+    try:
+        with open(ipath, 'r') as f:
+            saved = json.load(f)
+        if saved['version'] != INDEX_VERSION or saved['path'] != path:
+            raise ValueError('index is for a different directory or version')
+    except FileNotFoundError:
+        saved = None
+    except (ValueError, KeyError) as e:
+        log.warning('Rebuilding index %s (%s)', ipath, e)
+        saved = None
+
+    if saved is not None and saved['dir_mtime'] == dir_mtime:
+        files = saved['files']
+    else:
+        old = saved['files'] if saved is not None else {}
+        files = {}
+        new = []
+        for fn in list_dir(path):
+            try:
+                st = os.stat(os.path.join(path, fn))
+            except FileNotFoundError:
+                continue
+            if not os.path.isfile(os.path.join(path, fn)):
+                continue
+            e = old.get(fn)
+            if e is not None and e[0] == st.st_size \
+                    and e[1] == st.st_mtime_ns:
+                files[fn] = e
+            else:
+                files[fn] = [st.st_size, st.st_mtime_ns, None]
+                new.append(fn)
+        if new:
+            for fn, x in zip(new, parse(new)):
+                files[fn][2] = None if pd.isna(x) else int(x.value)
+        log.debug('Index %s updated; %i file(s), %i parsed', name,
+                  len(files), len(new))
+        try:
+            os.makedirs(os.path.dirname(ipath), exist_ok=True)
+            with atomic_output(ipath) as tmp:
+                with open(tmp, 'w') as f:
+                    json.dump({'version': INDEX_VERSION, 'path': path,
+                               'dir_mtime': dir_mtime, 'files': files}, f)
+        except OSError as e:
+            log.warning('Could not save index %s (%s)', ipath, e)
+
+    skip = [fn for fn, e in files.items() if e[2] is None]
+    if skip:
+        log.debug('%i file(s) in %s have no datetime: %s', len(skip), path,
+                  skip)
+    rows = [(e[2], fn, e[0], e[1]) for fn, e in files.items()
+            if e[2] is not None]
+    table = pd.DataFrame(rows, columns=['datetime', 'fn', 'size', 'mtime'])
+    table['datetime'] = pd.to_datetime(table['datetime'].astype('int64'))
+    table = table.sort_values(['datetime', 'fn'], kind='stable')\
+        .reset_index(drop=True)
+    _index[path] = (dir_mtime, table)
+    return table
+
+
+def archive_index(t: str) -> pd.DataFrame:
+    """
+    Index table of a raw data type, see dir_index
+
+    :param t: data type (Met, FC, UCASS, &c.)
+    """
+    return dir_index(get_log_path(None, t), t)
+
+
+def clear_file_cache():
+    """Drops the index tables and file matches held by this process"""
+    _index.clear()
+    _matches.clear()
+
+
 def match_raw_files(match_types: list | str, files: list | str | None = None,
                     default_type: str = 'UCASS',
                     tol_min: int = 20) -> pd.DataFrame:
     """
     A function to find matching raw files by datetime, assuming some data for
-    one data instance were in different files.
+    one data instance were in different files. Results are memoised in this
+    process until one of the directories involved changes (its mtime), or
+    clear_file_cache is called.
 
     :param files: list of files you want to match up
     :param match_types: folder name in the "Raw" directory
@@ -58,39 +234,69 @@ def match_raw_files(match_types: list | str, files: list | str | None = None,
 
     :return: dataframe of matches where the index is a datetime index.
     """
+    match_types = im.to_list(match_types)
+    files = im.to_list(files) if files else None
+    types = match_types if files else [default_type] + match_types
+    key = (ch.getval('base_data_path'), tuple(match_types),
+           tuple(files) if files else None, default_type, tol_min)
+    stamp = tuple(os.stat(get_log_path(None, t)).st_mtime_ns for t in types)
+    try:
+        if _matches[key][0] == stamp:
+            log.debug('Using memoised matches for %s', match_types)
+            return _matches[key][1].copy()
+    except KeyError:
+        pass
+    mf = _match_raw_files(match_types, files, default_type, tol_min)
+    _matches[key] = (stamp, mf)
+    return mf.copy()
+
+
+def _match_raw_files(match_types: list, files: list | None,
+                     default_type: str, tol_min: int) -> pd.DataFrame:
+    """match_raw_files without the memo"""
     if files:
-        files = im.to_list(files)
+        dt0s = im.to_list(im.fn_datetime(files))
     else:
-        files = os.listdir(get_log_path(None, default_type))
-    match_types = im.to_list(match_types)
-    # Get datetime from files
-    dt0s = im.to_list(im.fn_datetime(files))
+        dt0s = list(archive_index(default_type)['datetime'])
     # Make df with dt index for storage (match frame)
     mf = pd.DataFrame(index=pd.DatetimeIndex(dt0s))
     # mt can be 'Met', 'UCASS', &c
     for mt in match_types:
-        # mfn is a list of the matched file names
-        mfn = []
-        # dt0 is the datetime; in_file is the input file
-        for dt0 in dt0s:
-            # List of potential matches
-            tm = os.listdir(get_log_path(None, mt))
-            # Get match dts
-            fdt = im.to_list(im.fn_datetime(tm))
-            # Get deltas
-            delta_dt = [abs((x - dt0).total_seconds() / 60.0) for x in fdt]
-            if min(delta_dt) > tol_min:
-                # Fill with nans if tol is breached
-                mfn.append(np.nan)
-            else:
-                # Append filename using index to match
-                mfn.append(tm[list(delta_dt).index(min(delta_dt))])
-        # Write col to dataframe
-        mf[mt] = mfn
+        # Write col of matched file names to dataframe
+        mf[mt] = match_nearest(mf.index, archive_index(mt), tol_min)
     # Return sorted dataframe
     return mf.sort_index()
 
 
+def match_nearest(dts: pd.DatetimeIndex, table: pd.DataFrame,
+                  tol_min: float) -> np.ndarray:
+    """
+    Nearest file to each datetime, as a sorted nearest-neighbour join
+
+    :param dts: datetimes to match, in any order
+    :param table: index table of candidate files (see dir_index), sorted by
+    datetime
+    :param tol_min: tolerance of matches in minutes
+
+    :return: object array of file names in the order of dts, nan where the
+    nearest file is further than tol_min away
+    """
+    left = pd.DataFrame({'datetime': pd.DatetimeIndex(dts).as_unit('ns'),
+                         'pos': np.arange(len(dts))})\
+        .sort_values('datetime', kind='stable')
+    # The first of equal datetimes wins, and the earlier file of two equally
+    # near ones, as for the old argmin
+    right = table[['datetime', 'fn']]\
+        .drop_duplicates('datetime', keep='first')
+    right = right.assign(datetime=right['datetime'].dt.as_unit('ns'))
+    matched = pd.merge_asof(left, right, on='datetime', direction='nearest',
+                            tolerance=pd.Timedelta(minutes=tol_min))
+    out = np.full(len(dts), np.nan, dtype=object)
+    found = matched['fn'].notna().to_numpy()
+    out[matched['pos'].to_numpy()[found]] = matched['fn'].to_numpy()[found]
+    return out
+
+
 def make_dir_structure():
     """
     A function to create the data storage structure required for the software.
@@ -110,8 +316,8 @@ def make_dir_structure():
             try:
                 os.mkdir(path)
             except FileExistsError:
-                print('Directory \"%s\" already exists; skipping directory'
-                      % path)
+                log.debug('Directory \"%s\" already exists; skipping '
+                          'directory', path)
             if isinstance(val, dict):
                 make_dirs(val, os.path.join(root, key))
 
@@ -187,13 +393,15 @@ def infer_log_type(fn: str) -> str:
 
     :param fn: Filename
 
-    :raise ValueError: If the log extension is neither .log, .json, nor .csv
+    :raise ValueError: If the log extension is not .log, .json, .h5, .csv or
+    .tab
 
     :return: File extension
     """
     _, ext = os.path.splitext(fn)
     if (ext != '.log') and \
        (ext != '.json') and \
+       (ext != '.h5') and \
        (ext != '.csv') and \
        (ext != '.tab'):
         raise ValueError('%s is invalid fc log extension' % ext)
@@ -205,7 +413,7 @@ def get_files(dts: tuple, types: list[str],
               default_type="UCASS", index_method='nearest') -> pd.DataFrame:
     """
     gets files from datetime or between two datetime vars; primarily invokes
-    match_raw_files
+    match_raw_files, so repeated calls share its memoised matches
 
     :param dts: date times
     :param types: list of file types ('UCASS', 'Met', &c)
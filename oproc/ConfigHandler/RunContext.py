@@ -0,0 +1,142 @@
+__doc__ = """
+Immutable snapshot of the settings for one processing run. A RunContext is
+built once (from an instrument preset or the environment) and handed to the
+import, processing and plotting objects, so they do not need to read the
+environment. A context holding a config snapshot can be pickled into worker
+processes and activated there, after which ConfigHandler.getval never reads
+the config file.
+"""
+
+from dataclasses import dataclass, replace
+import os
+
+from .. import ConfigHandler as ch
+
+
+# Instrument presets; these used to be env vars hard-coded in main.py
+INSTRUMENTS = {
+    "UCASS": {"airspeed_type": "normal",
+              "material": "water",
+              "default_iss": "pace2022_sht_iss.json",
+              "material_iss": "ucass_scs_iss.json",
+              "wind_iss": "sammal_wd_iss.json",
+              "sv_type": "Airspeed"},
+    "CDP": {"material": "water",
+            "default_iss": "cdp_ql_iss.json",
+            "material_iss": "cdp_ql_scs_iss.json",
+            "sv_type": "Airspeed"},
+    "FFSSP": {"material": "water",
+              "default_iss": "ffssp_ql_iss.json",
+              "material_iss": "ffssp_ql_scs_iss.json",
+              "sv_type": "Airspeed"},
+    "PCASP": {"material": "water",
+              "default_iss": "pcasp_ql_iss.json",
+              "material_iss": "pcasp_ql_scs_iss.json",
+              "sv_type": "FlowRate"},
+}
+
+# Env var names of the context fields, for from_env/to_env
+ENV_VARS = {"instrument": "WORKING_INSTRUMENT",
+            "material": "WORKING_MATERIAL",
+            "default_iss": "DEFAULT_ISS",
+            "material_iss": "MATERIAL_ISS",
+            "wind_iss": "WIND_ISS",
+            "airspeed_type": "AIRSPEED_TYPE",
+            "sv_type": "SV_TYPE",
+            "plot_style": "PLOT_STYLE"}
+
+
+@dataclass(frozen=True)
+class RunContext:
+    """
+    Run settings. If config is None, config values are looked up live
+    through ConfigHandler; otherwise they come from the snapshot.
+    """
+
+    instrument: str | None = None
+    material: str | None = None
+    default_iss: str | None = None
+    material_iss: str | None = None
+    wind_iss: str | None = None
+    airspeed_type: str | None = None
+    sv_type: str | None = None
+    plot_style: str | None = "CopernicusStyle"
+    config: dict | None = None
+
+    def __hash__(self):
+        return hash(tuple(getattr(self, k) for k in ENV_VARS))
+
+    def __repr__(self):
+        return f'RunContext({self.instrument}, ' \
+               f'snapshot={self.config is not None})'
+
+    @classmethod
+    def for_instrument(cls, instrument: str, **kwargs):
+        """
+        Builds a context from the instrument presets
+
+        :param instrument: instrument name, e.g. "UCASS"
+        :param kwargs: fields to override in the preset
+        """
+        try:
+            preset = INSTRUMENTS[instrument]
+        except KeyError:
+            raise ValueError(f'No preset for instrument {instrument}, '
+                             f'valid instruments are {list(INSTRUMENTS)}')
+        return cls(instrument=instrument, **(preset | kwargs))
+
+    @classmethod
+    def from_env(cls):
+        """Builds a context from the legacy env vars"""
+        kw = dict([(k, os.environ[v]) for k, v in ENV_VARS.items()
+                   if v in os.environ])
+        return cls(**kw)
+
+    def to_env(self) -> dict:
+        """Env vars equivalent to this context, for subprocesses"""
+        return dict([(v, getattr(self, k)) for k, v in ENV_VARS.items()
+                     if getattr(self, k) is not None])
+
+    def snapshot(self):
+        """Returns a copy of the context holding a copy of the config"""
+        return replace(self, config=ch.snapshot())
+
+    def getval(self, name):
+        """Copy of a config value from the snapshot, or from ConfigHandler"""
+        if self.config is None:
+            return ch.getval(name)
+        try:
+            return ch._copy(self.config[name])
+        except KeyError:
+            raise AttributeError('Name %s does not exist' % name)
+
+    def peek(self, name):
+        """Config value without a copy, read-only; see ConfigHandler.peek"""
+        if self.config is None:
+            return ch.peek(name)
+        try:
+            return self.config[name]
+        except KeyError:
+            raise AttributeError('Name %s does not exist' % name)
+
+    def require(self, *names):
+        """
+        :raise RuntimeError: if any of the named fields are not set
+        """
+        missing = [x for x in names if getattr(self, x) is None]
+        if missing:
+            raise RuntimeError(f'run context fields {missing} are not set '
+                               f'(env vars {[ENV_VARS[x] for x in missing]})')
+
+
+def current() -> RunContext:
+    """The activated run context, or one built from the environment"""
+    ctx = ch.active_context()
+    if ctx is None:
+        ctx = RunContext.from_env()
+    return ctx
+
+
+def worker_init(ctx: RunContext):
+    """Process pool initializer that activates a context in the worker"""
+    ch.activate(ctx)
@@ -3,15 +3,27 @@ This python module is responsible for handling the JSON config file, including
 its initial creation.
 """
 
+import copy
 import json
 import os.path
 from pydoc import locate
 from warnings import warn
+import logging
 
 
 config_fn = 'OPROCConfig.json'
-config_path = os.path.join(os.path.split(os.path.abspath(__file__))
-                           [0], config_fn)
+# The OPROC_CONFIG env var points to another config file, e.g. for tests
+config_path = os.environ.get('OPROC_CONFIG',
+                             os.path.join(os.path.split(
+                                 os.path.abspath(__file__))[0], config_fn))
+log = logging.getLogger(__name__)
+
+# Process-wide cache of the config file, see _cached_conf
+_cache = {'stamp': None, 'items': {}, 'vals': {}}
+_cache_stats = {'hits': 0, 'misses': 0}
+
+# Run context activated with activate(), see RunContext.py
+_active = {'ctx': None}
 
 
 class _ConfVal:
@@ -69,18 +81,42 @@ def change_config(cd):
 
 
 def getval(name):
-    fcd = _read_conf()
-    cc = _ConfVal(_getitem(name, fcd)[-1])
-    cc.check()
-    return cc.val
+    """
+    Returns a copy of a config value. Values come from an in-memory cache;
+    callers get their own copy, so modifying it does not change the cache.
+    If a run context holding a config snapshot is active, the value comes
+    from the snapshot.
+    """
+    ctx = _active['ctx']
+    if (ctx is not None) and (ctx.config is not None):
+        return ctx.getval(name)
+    return _copy(_getcached(name).val)
+
+
+def peek(name):
+    """
+    Returns a config value without copying it, for read-only use in library
+    code where getval's copy would be too slow (e.g. FlagLib). The value is
+    the cached object, the same one until the config file changes, and must
+    not be modified.
+    """
+    ctx = _active['ctx']
+    if (ctx is not None) and (ctx.config is not None):
+        return ctx.peek(name)
+    return _getcached(name).val
+
+
+def _copy(val):
+    """Deep copy of a config value; immutable values are returned as is"""
+    if isinstance(val, (str, int, float, bool, type(None))):
+        return val
+    return copy.deepcopy(val)
 
 
 def getconf(name):
-    fcd = _read_conf()
-    cc = _ConfVal(_getitem(name, fcd)[-1])
-    cc.check()
-    print(json.dumps(cc.__dict__, indent=4, separators=(',', ': ')))
-    return cc.__dict__
+    cc = _getcached(name)
+    log.info('%s', json.dumps(cc.__dict__, indent=4, separators=(',', ': ')))
+    return copy.deepcopy(cc.__dict__)
 
 
 def del_config(name):
@@ -89,7 +125,40 @@ def del_config(name):
     _write_over_json(fcd)
 
 
+def snapshot() -> dict:
+    """Returns a copy of all config values indexed by name"""
+    return dict([(k, copy.deepcopy(_getcached(k).val))
+                 for k, v in _cached_conf().items() if len(v) == 1])
+
+
+def activate(ctx):
+    """
+    Sets the run context for this process; pass None to deactivate.
+
+    :param ctx: RunContext object
+    """
+    _active['ctx'] = ctx
+
+
+def active_context():
+    """Returns the active run context, or None"""
+    return _active['ctx']
+
+
+def cache_info() -> dict:
+    """Returns the config cache hit/miss counters and number of entries"""
+    return _cache_stats | {'size': len(_cache['items'])}
+
+
+def clear_cache():
+    """Drops the cached config so the next lookup reloads the file"""
+    _cache['stamp'] = None
+    _cache['items'] = {}
+    _cache['vals'] = {}
+
+
 def _write_over_json(cd):
+    clear_cache()
     with open(config_path, 'w') as cfp:
         try:
             json.dump(cd, cfp, indent=4, separators=(',', ': '))
@@ -109,6 +178,50 @@ def _read_conf():
     return fcd
 
 
+def _conf_stamp():
+    st = os.stat(config_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _cached_conf() -> dict:
+    """
+    Returns the config indexed by name. The file is only re-read when its
+    mtime or size has changed since the last load.
+    """
+    stamp = _conf_stamp()
+    if stamp == _cache['stamp']:
+        _cache_stats['hits'] += 1
+        return _cache['items']
+    _cache_stats['misses'] += 1
+    fcd = _read_conf()
+    items = {}
+    for x in fcd:
+        items.setdefault(x['name'], []).append(x)
+    _cache['items'] = items
+    _cache['vals'] = {}
+    _cache['stamp'] = stamp
+    return items
+
+
+def _getcached(name) -> _ConfVal:
+    items = _cached_conf()
+    try:
+        return _cache['vals'][name]
+    except KeyError:
+        pass
+    item_list = items.get(name, [])
+    if len(item_list) != 1:
+        if len(item_list) > 1:
+            raise AttributeError('More than one setting of name %s exists'\
+                                 % name)
+        else:
+            raise AttributeError('Name %s does not exist' % name)
+    cc = _ConfVal(item_list[0])
+    cc.check()
+    _cache['vals'][name] = cc
+    return cc
+
+
 def _getitem(name, fcd):
     item_list = [(i, x) for i, x in enumerate(fcd) if name == x['name']]
     if len(item_list) != 1:
@@ -123,5 +236,6 @@ def _getitem(name, fcd):
 
 def _blank_json():
     warn('Creating blank JSON')
+    clear_cache()
     with open(config_path, 'w') as cfp:
         cfp.write('[]')
@@ -1,10 +1,9 @@
 from .__Plot import Plot
 import numpy as np
-from ... import newprint
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class LinePlot2D(Plot):
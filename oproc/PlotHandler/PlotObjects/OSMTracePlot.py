@@ -1,13 +1,12 @@
 from .__Plot import Plot
 import numpy as np
-from ... import newprint
 import cartopy.crs as ccrs
 import cartopy.io.img_tiles as cimgt
 from matplotlib import pyplot as plt
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class OSMTracePlot(Plot):
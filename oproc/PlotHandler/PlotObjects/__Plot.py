@@ -1,7 +1,7 @@
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 from ...ArchiveHandler.GenericDataObjects.MatrixColumn import MatrixColumn
-from ... import newprint
-from ... import ConfigHandler as ch
+from ...ConfigHandler import RunContext as rc
+from ...ArchiveHandler import FlagLib as fl
 from ...ProcHandler import ProcLib as pl
 from .PlotSpec import PlotSpec as ps
 from ... import ureg
@@ -14,10 +14,10 @@ import inspect
 import textwrap
 import os
 import pint
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class Plot(object):
@@ -26,16 +26,16 @@ class Plot(object):
     object.
 
     :param di: MatrixDict object and data input.
+    :param ctx: run context, defaults to that of di
     """
 
     @final
-    def __init__(self, di: md, plot_spec: ps, **kwargs):
+    def __init__(self, di: md, plot_spec: ps,
+                 ctx: rc.RunContext | None = None, **kwargs):
 
-        try:
-            style = os.environ['PLOT_STYLE']
-        except KeyError:
-            raise RuntimeError('env var PLOT_STYLE is not set properly')
-        plt.style.use(f'oproc.PlotHandler.Styles.{style}')
+        self.ctx = di.ctx if ctx is None else ctx
+        self.ctx.require('plot_style')
+        plt.style.use(f'oproc.PlotHandler.Styles.{self.ctx.plot_style}')
 
         self.__di = None
         self.__ivars = None
@@ -91,7 +91,7 @@ class Plot(object):
 
     def init_fig(self):
         if self.__fig:
-            print("figure object exists")
+            log.debug("figure object exists")
             return
         else:
             fig, ax = plt.subplots(self.shape[0], self.shape[1],\
@@ -117,15 +117,14 @@ class Plot(object):
             arr[arr == 0] = np.nan
             return arr
 
-    @staticmethod
-    def get_disp_name(tag_name: str) -> str:
-        tags = ch.getval('valid_flags')
+    def get_disp_name(self, tag_name: str) -> str:
+        tag = fl.get_index(self.ctx).by_name[tag_name]
         try:
-            d_name = [x['disp'] for x in tags if x['name']==tag_name][0]
+            d_name = tag['disp']
         except KeyError:
-            d_name = [x['name'] for x in tags if x['name']==tag_name][0]
+            d_name = tag['name']
         try:
-            unit = [x['unit'] for x in tags if x['name']==tag_name][0]
+            unit = tag['unit']
         except KeyError:
             unit = ''
         try:
@@ -156,7 +155,7 @@ class Plot(object):
     def get_ivars(self, dimless=False):
         """gets all the values for the ivars from md"""
         md_dict = self.di.__get__()
-        tag_suffix = ch.getval("tag_suffix")
+        tag_suffix = self.ctx.getval("tag_suffix")
         var_dict = {}
         for kvar in self.plot_spec.ivars:
             if tag_suffix in kvar:
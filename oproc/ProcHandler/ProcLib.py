@@ -2,14 +2,25 @@
 Library to store functions for processing data.
 """
 import os
-import re
 from .. import ConfigHandler as ch
-from .. import newprint
+from ..ArchiveHandler import FlagLib as fl
+from ..ArchiveHandler import Utilities as utils
+from ..ArchiveHandler.RawDataObjects import RawFile as rfo
+import copy
+from collections import OrderedDict
+import hashlib
 import pandas as pd
 import numpy as np
+import logging
 
 
-print = newprint()
+log = logging.getLogger(__name__)
+
+# Ancillary (wind, material, &c) files last read by this process, oldest first
+_ancillary = OrderedDict()
+ANCILLARY_MAX = 8
+# scs to radius lookups of this process, keyed by a hash of the table
+_lookups = {}
 
 
 def get_all_suffix(var: str, din: dict) -> dict:
@@ -39,21 +50,15 @@ def require_vars(var_list: list, kwargs: dict):
         tests = list(kwargs.keys())
         tag_suffix = ch.getval("tag_suffix")
         if tag_suffix in var:
-            to = []
-            for test in tests:
-                try:
-                    to.append(test.replace(
-                        re.search(r'(?=\d)\w+', test).group(), tag_suffix))
-                except AttributeError:
-                    to.append(test)
-            tests = to
+            fi = fl.get_index()
+            tests = [fi.template(test) for test in tests]
         present = False
         for k in tests:
             if k == var:
                 present = True
         if present is False:
             raise ValueError(f'variable {var} not present in kwargs')
-    print('Var check passed')
+    log.debug('Var check passed')
     return
 
 
@@ -61,8 +66,125 @@ def not_require_vars(var_list: list, kwargs: dict):
     try:
         require_vars(var_list, kwargs)
     except ValueError:
-        print('Var check passed')
+        log.debug('Var check passed')
         return
     raise ValueError(f'Output variable already in struct')
 
 
+
+
+def run_chain(di, chain: list, **kwargs):
+    """
+    Runs a list of Proc classes one after another
+
+    :param di: MatrixDict input to the first process
+    :param chain: list of Proc subclasses, in run order
+    :param kwargs: passed to every process
+    :return: output MatrixDict of the last process
+    """
+    do = di
+    for proc in chain:
+        log.debug('Running %s', proc.__name__)
+        do = proc(do, **kwargs).proc()
+    return do
+
+
+def read_ancillary(isso, ctx, **kwargs) -> dict:
+    """
+    Reads the files of an iss with RawFile, once per process; later calls for
+    the same iss, kwargs and run context reuse the data read first, until a
+    directory of the files changes mtime (files added, removed or replaced).
+    The last ANCILLARY_MAX reads are kept. The data is shared between
+    callers, so its arrays are made read only.
+
+    :param isso: iss object
+    :param ctx: run context
+    :param kwargs: passed to RawFile
+    :return: dict of the data of each file, as RawFile.read
+    """
+    key = (tuple((k, rec['type']) for k, rec in isso.dflags.items()),
+           tuple(sorted(kwargs.items())), ctx)
+    try:
+        dirs, stamp, dflags, data = _ancillary[key]
+        if dflags == isso.dflags and _dir_stamp(dirs) == stamp:
+            _ancillary.move_to_end(key)
+            log.debug('Using ancillary data already read from %s',
+                      list(isso.dflags))
+            return dict(data)
+    except KeyError:
+        pass
+    dirs = sorted(set(os.path.dirname(utils.get_log_path(k, rec['type']))
+                      for k, rec in isso.dflags.items()))
+    stamp = _dir_stamp(dirs)
+    with rfo.RawFile(isso, ctx=ctx, **kwargs) as rf:
+        data = rf.read()
+    for v in data.values():
+        _read_only(v)
+    # Entries of the same files read before the directories changed
+    for k in [k for k, v in _ancillary.items()
+              if k[0] == key[0] and v[1] != stamp]:
+        del _ancillary[k]
+    _ancillary[key] = (dirs, stamp, copy.deepcopy(isso.dflags), data)
+    _ancillary.move_to_end(key)
+    while len(_ancillary) > ANCILLARY_MAX:
+        _ancillary.popitem(last=False)
+    return dict(data)
+
+
+def _dir_stamp(dirs: list) -> tuple:
+    return tuple(os.stat(d).st_mtime_ns for d in dirs)
+
+
+def _read_only(data):
+    """Makes the arrays of a RawFile.read result read only, in place"""
+    cols = data.col_dict if hasattr(data, 'col_dict') else data
+    for v in cols.values():
+        v = getattr(v, 'val', v)
+        if isinstance(v, np.ndarray):
+            v.flags.writeable = False
+
+
+def scs_lookup(scs, rad) -> tuple:
+    """
+    Monotone scattering cross section to radius lookup of a material table.
+    Scs is not monotone in radius (Mie resonances), so the table is sorted
+    by radius and only the points where scs rises above all smaller radii
+    are kept; an scs then maps to the smallest radius which reaches it.
+    Lookups are memoised by the table contents.
+
+    :param scs: scattering cross sections of the table
+    :param rad: radii of the table
+    :return: (scs, radius) arrays, both increasing
+    """
+    scs = np.asarray(scs, dtype=float).ravel()
+    rad = np.asarray(rad, dtype=float).ravel()
+    key = hashlib.sha1(scs.tobytes() + rad.tobytes()).hexdigest()
+    try:
+        return _lookups[key]
+    except KeyError:
+        pass
+    ok = ~(np.isnan(scs) | np.isnan(rad))
+    order = np.argsort(rad[ok], kind='stable')
+    scs, rad = scs[ok][order], rad[ok][order]
+    prev = np.maximum.accumulate(np.concatenate([[-np.inf], scs[:-1]]))
+    rising = scs > prev
+    _lookups[key] = (scs[rising], rad[rising])
+    return _lookups[key]
+
+
+def scs_to_radius(scs, lookup: tuple) -> np.ndarray:
+    """
+    Radii of scattering cross sections, by linear interpolation
+
+    :param scs: cross sections to look up
+    :param lookup: table from scs_lookup
+    :return: radii; clamped to the radii at the table ends outside it
+    """
+    return np.interp(np.asarray(scs, dtype=float).ravel(), *lookup)
+
+
+def clear_cache():
+    """Drops the ancillary data and file matches held by this process"""
+    _ancillary.clear()
+    _lookups.clear()
+    utils.clear_file_cache()
@@ -1,13 +1,12 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 import numpy as np
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 import datetime as dt
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 def check_aoa_fixedwing(pitch, yaw, gs, vz, alt, time, wa_deg,\
@@ -84,7 +83,7 @@ class AOAMask(Proc):
         aoamd = md({'AOAMask': aoa_mask, 'AoA': aoa, \
                     'Time': self.di.__get__()['Time'], \
                     'date_time': self.di.__get__()['date_time']}, \
-                   unit_spec='default')
+                   unit_spec='default', ctx=self.ctx)
         self.do = aoamd
         return self.do
 
@@ -1,35 +1,33 @@
 from .__Proc import Proc
-from ... import newprint
 import pandas as pd
 import numpy as np
 import os
 from ...ArchiveHandler.RawDataObjects.iss import iss as imspec
-from ...ArchiveHandler.RawDataObjects.RawFile import RawFile
+from ...ArchiveHandler.RawDataObjects import RawFile as rfo
+from ...ArchiveHandler import Utilities as utils
 from ...ArchiveHandler import ImportLib as im
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 from ...ArchiveHandler.GenericDataObjects.MatrixColumn\
         import MatrixColumn as mc
 from ... import ConfigHandler as ch
+from ...ConfigHandler import RunContext as rc
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
+# Flattened material tables of this process:
+# (material, instrument, iss, base path, folder) -> (path, (size, mtime), table)
+_tables = {}
 
-def get_ops_material_data():
-    try:
-        material = os.environ["WORKING_MATERIAL"]
-        instrument = os.environ["WORKING_INSTRUMENT"]
-        iss_path = os.environ["MATERIAL_ISS"]
-    except KeyError:
-        raise RuntimeError("env vars WORKING_MATERIAL, MATERIAL_ISS and\
-                           WORKING_INSTRUMENT are not set, set these in\
-                           main.py")
-
-    mat_path = os.path.join(ch.getval('base_data_path'), 'Raw',
-                            ch.getval('ops_material_folder'))
-    mat_file = [x for x in os.listdir(mat_path) if material in x]
-    mat_file = [x for x in mat_file if instrument in x]
+
+def material_file(ctx: rc.RunContext) -> str:
+    """Material table file name of the context's material and instrument"""
+    ctx.require('material', 'instrument')
+    mat_path = os.path.join(ctx.getval('base_data_path'), 'Raw',
+                            ctx.getval('ops_material_folder'))
+    mat_file = [x for x in utils.list_dir(mat_path) if ctx.material in x]
+    mat_file = [x for x in mat_file if ctx.instrument in x]
     if not mat_file:
         raise FileNotFoundError
     elif len(mat_file) != 1:
@@ -40,30 +38,51 @@ def get_ops_material_data():
             mat_file = mat_file[0]
     else:
         mat_file = mat_file[0]
+    return os.path.join(mat_path, mat_file)
+
+
+def get_ops_material_data(ctx: rc.RunContext):
+    """
+    Material table of the context's material and instrument. The flattened
+    table is kept per process, keyed by material, instrument and iss, and
+    read again only when the table file changes size or mtime.
+
+    :return: dict of flat, read only arrays; copy an array to modify it
+    """
+    ctx.require('material', 'instrument', 'material_iss')
+    key = (ctx.material, ctx.instrument, ctx.material_iss,
+           ctx.peek('base_data_path'), ctx.peek('ops_material_folder'))
+    try:
+        path, stamp, table = _tables[key]
+        st = os.stat(path)
+        if (st.st_size, st.st_mtime_ns) == stamp:
+            return dict(table)
+    except (KeyError, FileNotFoundError):
+        pass
+    path = material_file(ctx)
+    st = os.stat(path)
 
-    issd = im.get_iss_json(iss_path, obj=False)
+    issd = im.get_iss_json(ctx.material_iss, obj=False)
     if len(issd) != 1:
         raise ValueError("iss must point to one file only")
-    issd[mat_file] = issd.pop(list(issd.keys())[0])
+    issd[os.path.split(path)[-1]] = issd.pop(list(issd.keys())[0])
     isso = imspec(issd)
 
-    with RawFile(isso, nc=True) as rf:
+    with rfo.RawFile(isso, ctx=ctx, nc=True) as rf:
         data = rf.read()
 
     if len(data) != 1:
         raise ValueError("iss must point to one file only")
 
-    data = data[list(data.keys())[0]]
-    for k, v in data.items():
-        var = v
+    table = {}
+    for k, v in data[list(data.keys())[0]].items():
         if isinstance(v, mc):
-            var = var.__get__()
-        try:
-            var = np.asarray(var).ravel()
-        except AttributeError:
-            pass
-        data[k] = var
-    return data
+            v = v.__get__()
+        var = np.array(v).ravel()
+        var.flags.writeable = False
+        table[k] = var
+    _tables[key] = (path, (st.st_size, st.st_mtime_ns), table)
+    return dict(table)
 
 
 class AddMaterial(Proc):
@@ -75,7 +94,7 @@ class AddMaterial(Proc):
                           'density':'kg m**-3'}
 
     def proc(self):
-        matdat = get_ops_material_data()
+        matdat = get_ops_material_data(self.ctx)
         self.do = matdat
         return self.do
 
@@ -1,25 +1,22 @@
 from .__Proc import Proc
-from ... import newprint
-from ...ArchiveHandler.RawDataObjects.RawFile import RawFile
+from .. import ProcLib as pl
 from ...ArchiveHandler import ImportLib as im
 from ...ArchiveHandler import Utilities as utils
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 from ... import ConfigHandler as ch
+from ...ConfigHandler import RunContext as rc
 
 import pandas as pd
 import numpy as np
-import os
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
-def get_WD_data(date_time):
-    try:
-        iss_path = os.environ["WIND_ISS"]
-    except KeyError:
-        raise RuntimeError("env var WIND_ISS is not set")
+def get_WD_data(date_time, ctx: rc.RunContext):
+    ctx.require('wind_iss')
+    iss_path = ctx.wind_iss
 
     issd = im.get_iss_json(iss_path, obj=False)
     types = im.types_from_iss(issd)
@@ -30,8 +27,7 @@ def get_WD_data(date_time):
     dt = fdf.index[0]
     isso = im.get_iss_obj(issd, fdf, dt)
 
-    with RawFile(isso) as rf:
-        data = rf.read()
+    data = pl.read_ancillary(isso, ctx)
 
     if len(data) != 1:
         raise ValueError("iss must point to one file only")
@@ -50,7 +46,7 @@ class AddWindDat(Proc):
 
     def proc(self):
         tvars = self.get_timevars()
-        WD_arr = get_WD_data(tvars['date_time'])
+        WD_arr = get_WD_data(tvars['date_time'], self.ctx)
         WD = WD_arr.df_dt_index(tvars['date_time'])
         self.do = {'WD': WD['WD'].to_list()[0], 'WS': WD['WS'].to_list()[0]}
         return self.do
@@ -1,13 +1,12 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 import numpy as np
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 import datetime as dt
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 def gs_corrected_asp(pitch, yaw, gs, ws_h, alt, time, wa_deg):
@@ -80,7 +79,8 @@ class AirspeedCorrection(Proc):
                                data['WS'][0], data['Alt'], tstime, data['WD'][0])
         asp[asp < 5] = np.nan
         asmd = md({'corrected_airspeed': asp, 'Time': tdat['Time'], \
-                    'date_time': tdat['date_time']}, unit_spec='default')
+                    'date_time': tdat['date_time']}, unit_spec='default',
+                   ctx=self.ctx)
         self.do = asmd
         return self.do
 
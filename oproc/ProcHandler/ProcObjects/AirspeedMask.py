@@ -1,13 +1,12 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 import pandas as pd
 import numpy as np
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 def get_arsp_mask(airspeed, limit):
@@ -31,7 +30,8 @@ class AirspeedMask(Proc):
         data = self.get_ivars(dimless=True)
         mask = get_arsp_mask(data['Airspeed'], data['airspeed_lim'])
         timevars = self.get_timevars()
-        arspmd = md({"airspeed_mask": mask} | timevars, unit_spec='default')
+        arspmd = md({"airspeed_mask": mask} | timevars, unit_spec='default',
+                    ctx=self.ctx)
         self.do = arspmd
         return self.do
 
@@ -1,13 +1,12 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 
 import numpy as np
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class BinCentres(Proc):
@@ -1,15 +1,18 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ... import ConfigHandler as ch
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 
 import numpy as np
 import pandas as pd
+import hashlib
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
+
+# Material tables sorted by scs, keyed by a hash of the table
+_tables = {}
 
 
 def interp_linear(lookup: pd.DataFrame, data: pd.DataFrame, x: str, v: str):
@@ -20,7 +23,65 @@ def interp_linear(lookup: pd.DataFrame, data: pd.DataFrame, x: str, v: str):
     return data.to_list()
 
 
+def _sorted_table(scs: np.ndarray, rad: np.ndarray) -> tuple | None:
+    """Table sorted by scs, or None if scs has duplicates or nan"""
+    key = hashlib.sha1(scs.tobytes() + rad.tobytes()).hexdigest()
+    try:
+        return _tables[key]
+    except KeyError:
+        pass
+    order = np.argsort(scs, kind='stable')
+    ss, rs = scs[order], rad[order]
+    if np.isnan(ss).any() or (np.diff(ss) == 0).any():
+        _tables[key] = None
+    else:
+        _tables[key] = (ss, rs)
+    return _tables[key]
+
+
+def interp_merge(scs, mat_scs, mat_rad) -> list:
+    """
+    interp_linear in numpy: radii interpolated by position over the sorted
+    union of the bin and table cross sections, nan before the first table
+    radius and the last radius after the end. Falls back to interp_linear if
+    either has repeated or nan cross sections, where the merge repeats rows.
+
+    :param scs: bin cross sections
+    :param mat_scs: table cross sections
+    :param mat_rad: table radii
+    :return: radii of the bin cross sections
+    """
+    q = np.asarray(scs, dtype=float).ravel()
+    ts = np.asarray(mat_scs, dtype=float).ravel()
+    tr = np.asarray(mat_rad, dtype=float).ravel()
+    table = _sorted_table(ts, tr)
+    qs = np.sort(q)
+    if table is None or np.isnan(qs).any() or (np.diff(qs) == 0).any():
+        return interp_linear(pd.DataFrame({'mat_scs': scs}),
+                             pd.DataFrame({'mat_rad': mat_rad,
+                                           'mat_scs': mat_scs}),
+                             'mat_scs', 'mat_rad')
+    ss, rs = table
+    keys = np.union1d(qs, ss)
+    rad = np.full(len(keys), np.nan)
+    rad[np.searchsorted(keys, ss)] = rs
+    ok = ~np.isnan(rad)
+    if ok.any():
+        pos = np.arange(len(keys))
+        fill = ~ok & (pos > pos[ok][0])
+        rad[fill] = np.interp(pos[fill], pos[ok], rad[ok])
+    return rad[np.searchsorted(keys, q)].tolist()
+
+
 class BinRadii(Proc):
+    """
+    Bin radii from the material table. The "scs_lookup" kwarg selects the
+    lookup: "merge" (default) interpolates over the merge of the bin and
+    table cross sections (interp_merge, as interp_linear); "pandas" is the
+    same with interp_linear itself; "monotone" interpolates over the
+    monotone segments of the table (ProcLib.scs_lookup), clamped at the
+    table ends.
+    """
 
     def setup(self):
         self.ivars = ['bcs_sca', 'mat_rad', 'mat_scs', 'bbs_sca']
@@ -29,13 +90,27 @@ class BinRadii(Proc):
 
     def proc(self):
         data = self.get_ivars(dimless=True)
-        matdat = pd.DataFrame({k: data[k] for k in ['mat_rad', 'mat_scs']})
+        how = self.args.get('scs_lookup', 'merge')
+        if how == 'monotone':
+            lookup = pl.scs_lookup(data['mat_scs'], data['mat_rad'])
+            bc_rads = pl.scs_to_radius(data['bcs_sca'], lookup).tolist()
+            bb_rads = pl.scs_to_radius(data['bbs_sca'], lookup).tolist()
+        elif how == 'merge':
+            bc_rads = interp_merge(data['bcs_sca'], data['mat_scs'],
+                                   data['mat_rad'])
+            bb_rads = interp_merge(data['bbs_sca'], data['mat_scs'],
+                                   data['mat_rad'])
+        elif how == 'pandas':
+            matdat = pd.DataFrame({k: data[k] for k in ['mat_rad',
+                                                        'mat_scs']})
 
-        lookup = pd.DataFrame({"mat_scs": data['bcs_sca']})
-        bc_rads = interp_linear(lookup, matdat, 'mat_scs', 'mat_rad')
+            lookup = pd.DataFrame({"mat_scs": data['bcs_sca']})
+            bc_rads = interp_linear(lookup, matdat, 'mat_scs', 'mat_rad')
 
-        lookup = pd.DataFrame({"mat_scs": data['bbs_sca']})
-        bb_rads = interp_linear(lookup, matdat, 'mat_scs', 'mat_rad')
+            lookup = pd.DataFrame({"mat_scs": data['bbs_sca']})
+            bb_rads = interp_linear(lookup, matdat, 'mat_scs', 'mat_rad')
+        else:
+            raise ValueError(f'Invalid scs_lookup {how}')
 
         bvs = [4/3*np.pi*x**3 for x in bc_rads]
         self.do = {'bvs': bvs, 'bc_rads': bc_rads, 'bb_rads': bb_rads}
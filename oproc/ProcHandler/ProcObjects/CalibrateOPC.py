@@ -1,12 +1,11 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
 import numpy as np
-from ... import newprint
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class CalibrateOPC(Proc):
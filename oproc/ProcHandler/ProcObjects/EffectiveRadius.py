@@ -1,14 +1,13 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ... import ureg
 import numpy as np
 import pandas as pd
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 def eff_rad_row(nc, bc):
@@ -53,7 +52,8 @@ class EffectiveRadius(Proc):
             if c[0] < count_threshold:
                 e_rad[i] = np.nan
 
-        self.do = md({'effective_radius': e_rad} | tdat, unit_spec='default')
+        self.do = md({'effective_radius': e_rad} | tdat, unit_spec='default',
+                     ctx=self.ctx)
         return self.do
 
     def __repr__(self):
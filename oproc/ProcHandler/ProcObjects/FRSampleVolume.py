@@ -1,14 +1,13 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ... import ureg
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 import numpy as np
 import os
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class FRSampleVolume(Proc):
@@ -34,7 +33,7 @@ class FRSampleVolume(Proc):
                    sample_volume, \
                       "date_time": tvars["date_time"],
                       "Time": tvars["Time"]},
-                    unit_spec="default")
+                    unit_spec="default", ctx=self.ctx)
         self.do = svmd
         return self.do
 
@@ -1,14 +1,13 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ... import ureg
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 import numpy as np
 import os
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class GetPeriod(Proc):
@@ -35,7 +34,8 @@ class GetPeriod(Proc):
                         "date_time": tvars["date_time"],
                         "Time": tvars["Time"]
                     },
-                    unit_spec="default"
+                    unit_spec="default",
+                    ctx=self.ctx
         )
         self.do = pmd
         return self.do
@@ -1,14 +1,13 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ... import ureg
 import numpy as np
 import pandas as pd
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class MConc(Proc):
@@ -31,10 +30,10 @@ class MConc(Proc):
         b_mass = np.matrix(np.reshape([x.magnitude for x in b_mass], (-1, 1)))
         total_mass = np.sum(np.matmul(counts, b_mass), axis=1)
         mc = np.divide(total_mass, data['sample_volume'])
-        print(mc.shape)
+        log.debug('mass conc shape %s', mc.shape)
         self.do = md({"mass_conc": mc, "date_time": tdat["date_time"],\
                      "Time": tdat["Time"]},\
-                     unit_spec="default")
+                     unit_spec="default", ctx=self.ctx)
         return self.do
 
     def __repr__(self):
@@ -1,13 +1,12 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 import pandas as pd
 import numpy as np
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class NConc(Proc):
@@ -27,7 +26,7 @@ class NConc(Proc):
         nc = np.divide(counts, sv.__get__())
         self.do = md({"number_conc": nc, "date_time": data["date_time"],
                      "Time": data["Time"]},\
-                     unit_spec="default")
+                     unit_spec="default", ctx=self.ctx)
         return self.do
 
     def __repr__(self):
@@ -1,13 +1,12 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from scipy.signal import find_peaks
 import numpy as np
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 def split_by_pressure(press_hpa: np.matrix, press_lim,\
@@ -44,13 +43,13 @@ def split_by_pressure(press_hpa: np.matrix, press_lim,\
             prom += 10
             counter += 1
             if (counter > 200) or (num_prof < exp_range[0]):
-                print(num_prof)
+                log.error('%s profiles detected', num_prof)
                 input()
                 raise ValueError("Problem detecting peaks")
         else:
             break
 
-    print(f"{num_prof} profiles detected")
+    log.info('%s profiles detected', num_prof)
     if num_prof <= 1:
         raise ValueError("Not enought profiles detected, revise inputs")
 
@@ -62,7 +61,7 @@ def split_by_pressure(press_hpa: np.matrix, press_lim,\
         profile_store[n_peaks[i]:p_peaks[i+1], j] = 1
         j += 1
 
-    print(np.shape(profile_store))
+    log.debug('profile mask shape %s', np.shape(profile_store))
     return profile_store
 
 
@@ -79,9 +78,10 @@ class ProfileSplit(Proc):
         pmsk = split_by_pressure(press, -10)
         pmsk = {"PMask"+str((i+1)): pmsk[:, i] \
                 for i in range(np.shape(pmsk)[1])}
-        print(pmsk)
+        log.debug('profile masks %s', pmsk)
         psmd = md(pmsk | {"Time": data["Time"],
-                   "date_time":data["date_time"]}, unit_spec="default")
+                   "date_time":data["date_time"]}, unit_spec="default",
+                  ctx=self.ctx)
         self.do = psmd
         return self.do
 
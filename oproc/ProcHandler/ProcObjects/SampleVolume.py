@@ -1,13 +1,11 @@
 from .__Proc import Proc
 from .. import ProcLib as pl
-from ... import newprint
 from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 import numpy as np
-import os
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class SampleVolume(Proc):
@@ -22,24 +20,21 @@ class SampleVolume(Proc):
         tvars = self.get_timevars()
         sa = data["SA"]
         period = data["Period"]
-        try:
-            arsp_type = os.environ['AIRSPEED_TYPE']
-            if arsp_type == 'corrected':
-                arsp = data["corrected_airspeed"]
-            elif arsp_type == 'normal':
-                arsp = data["Airspeed"]
-            else:
-                raise ValueError(f'invalid value of AIRSPEED_TYPE env var: \
-                                 {arsp_arsp_type}')
-        except KeyError:
-            print('env var AIRSPEED_TYPE is not set, assuming normal \
-                  airspeed')
+        arsp_type = self.ctx.airspeed_type
+        if arsp_type == 'corrected':
+            arsp = data["corrected_airspeed"]
+        elif arsp_type == 'normal':
             arsp = data["Airspeed"]
+        elif arsp_type is None:
+            log.warning('airspeed type is not set, assuming normal airspeed')
+            arsp = data["Airspeed"]
+        else:
+            raise ValueError(f'invalid value of airspeed type: {arsp_type}')
         svmd = md({"sample_volume": \
                    np.multiply(period, arsp)*sa, \
                       "date_time": tvars["date_time"],
                       "Time": tvars["Time"]},
-                    unit_spec="default")
+                    unit_spec="default", ctx=self.ctx)
         self.do = svmd
         return self.do
 
@@ -2,8 +2,8 @@ from ...ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict as md
 from ...ArchiveHandler.GenericDataObjects.MatrixColumn import MatrixColumn
 from ...ArchiveHandler import ImportLib as im
 from .. import ProcLib as pl
-from ... import newprint
-from ... import ConfigHandler as ch
+from .. import ProcProfile as pp
+from ...ConfigHandler import RunContext as rc
 
 from typing import final
 import pandas as pd
@@ -11,10 +11,11 @@ import numpy as np
 import ast
 import inspect
 import textwrap
+import time
+import logging
 
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
 
 class Proc(object):
@@ -23,11 +24,20 @@ class Proc(object):
     object.
 
     :param di: MatrixDict object and data input.
+    :param ctx: run context, defaults to that of di
     """
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Instruments each user-defined proc for ProcProfile
+        if 'proc' in cls.__dict__:
+            cls.proc = pp.profile_proc(cls.proc)
+
     @final
-    def __init__(self, di: md, **kwargs):
+    def __init__(self, di: md, ctx: rc.RunContext | None = None, **kwargs):
 
+        t0 = time.perf_counter()
+        self.ctx = ctx
         self.__di = None
         self.__do = None
         self.unit_spec = None
@@ -37,6 +47,8 @@ class Proc(object):
 
         self.__self_check()
         self.di = di
+        if self.ctx is None:
+            self.ctx = di.ctx
 
         setup_exists = False
         for cls in reversed(self.__class__.mro()):
@@ -46,9 +58,10 @@ class Proc(object):
         if not setup_exists:
             raise AttributeError("setup not implemented in subclass")
         self.__var_check()
+        self._init_wall = time.perf_counter() - t0
 
     def setup(self):
-        print("Running setup")
+        log.debug("Running setup")
         pass
 
     def proc(self):
@@ -65,7 +78,7 @@ class Proc(object):
     def get_ivars(self, dimless=False):
         """gets all the values for the ivars from md or kwargs"""
         md_dict = self.di.__get__()
-        tag_suffix = ch.getval("tag_suffix")
+        tag_suffix = self.ctx.getval("tag_suffix")
         var_dict = {}
         for kvar in self.ivars:
             if tag_suffix in kvar:
@@ -143,6 +156,7 @@ class Proc(object):
 
     @do.setter
     def do(self, val):
+        t0 = time.perf_counter()
         if isinstance(val, md):
             dd = val.__get__()
             output = self.di + val
@@ -151,6 +165,7 @@ class Proc(object):
             output = self.di.add_nc(val, self.unit_spec)
         else:
             raise TypeError
+        pp.add_merge(time.perf_counter() - t0)
         pl.require_vars(self.ovars, dd)
         self.__do = output
 
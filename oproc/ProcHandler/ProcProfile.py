@@ -0,0 +1,195 @@
+"""
+Per-stage timing and memory instrumentation for Proc pipelines. Disabled by
+default; when enabled, every Proc.proc() call is recorded as one stage record
+and the records can be aggregated per stage and exported as JSON or CSV.
+"""
+import csv
+import json
+import time
+import functools
+import tracemalloc
+import logging
+
+
+log = logging.getLogger(__name__)
+
+_state = {'enabled': False, 'records': [], 'current': None,
+          'own_tracing': False}
+
+# Column order for summaries and CSV export
+RECORD_FIELDS = ['stage', 'group', 'init_wall', 'wall', 'cpu', 'mem_peak',
+                 'merge_wall', 'merges', 'rows_in', 'cols_in', 'rows_out',
+                 'cols_out']
+SUMMARY_FIELDS = ['stage', 'calls', 'wall_total', 'wall_mean', 'cpu_total',
+                  'init_total', 'merge_total', 'merge_frac', 'mem_peak_max',
+                  'rows_in_mean', 'cols_in_mean', 'rows_out_mean',
+                  'cols_out_mean']
+
+
+class StageRecord(object):
+    """Measurements for one Proc.proc() call"""
+
+    def __init__(self, stage: str, group: str | None = None):
+        self.stage: str = stage
+        self.group: str | None = group
+        self.init_wall: float = 0.0
+        self.wall: float = 0.0
+        self.cpu: float = 0.0
+        self.mem_peak: int | None = None
+        self.merge_wall: float = 0.0
+        self.merges: int = 0
+        self.rows_in: int | None = None
+        self.cols_in: int | None = None
+        self.rows_out: int | None = None
+        self.cols_out: int | None = None
+
+    def as_dict(self) -> dict:
+        return dict([(k, getattr(self, k)) for k in RECORD_FIELDS])
+
+    def __repr__(self):
+        return f'StageRecord({self.stage}, {self.wall:.3f}s)'
+
+
+def enable(trace_memory: bool = True):
+    """
+    Turns profiling on
+
+    :param trace_memory: record peak memory with tracemalloc; this slows
+    the pipeline down noticeably
+    """
+    _state['enabled'] = True
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _state['own_tracing'] = True
+
+
+def disable():
+    """Turns profiling off; records are kept until reset()"""
+    _state['enabled'] = False
+    if _state['own_tracing']:
+        tracemalloc.stop()
+        _state['own_tracing'] = False
+
+
+def is_enabled() -> bool:
+    return _state['enabled']
+
+
+def reset():
+    """Drops all the stage records"""
+    _state['records'] = []
+
+
+def records() -> list[dict]:
+    """All stage records as dicts, in call order"""
+    return [x.as_dict() for x in _state['records']]
+
+
+def add_merge(seconds: float):
+    """Adds MatrixDict merge time to the stage currently running"""
+    rec = _state['current']
+    if rec is not None:
+        rec.merge_wall += seconds
+        rec.merges += 1
+
+
+def _shape(di) -> tuple:
+    try:
+        return di.Time.shape[0], len(di.col_dict)
+    except (AttributeError, TypeError):
+        return None, None
+
+
+def profile_proc(func):
+    """Decorator for Proc.proc methods, records one StageRecord per call"""
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not _state['enabled']:
+            return func(self, *args, **kwargs)
+        try:
+            group = str(self.di.date_time)
+        except AttributeError:
+            group = None
+        rec = StageRecord(type(self).__name__, group)
+        rec.init_wall = getattr(self, '_init_wall', 0.0)
+        rec.rows_in, rec.cols_in = _shape(self.di)
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            mem0 = tracemalloc.get_traced_memory()[0]
+        _state['current'] = rec
+        w0 = time.perf_counter()
+        c0 = time.process_time()
+        try:
+            out = func(self, *args, **kwargs)
+        finally:
+            rec.wall = time.perf_counter() - w0
+            rec.cpu = time.process_time() - c0
+            _state['current'] = None
+            if tracing:
+                rec.mem_peak = tracemalloc.get_traced_memory()[1] - mem0
+            _state['records'].append(rec)
+        rec.rows_out, rec.cols_out = _shape(out)
+        log.debug('%s took %.3f s (%.3f s merging)', rec.stage, rec.wall,
+                  rec.merge_wall)
+        return out
+
+    return wrapper
+
+
+def summary() -> list[dict]:
+    """Records aggregated per stage, ranked by total wall time"""
+    def __mean(x):
+        x = [i for i in x if i is not None]
+        return sum(x) / len(x) if x else None
+
+    stages = {}
+    for rec in _state['records']:
+        stages.setdefault(rec.stage, []).append(rec)
+    out = []
+    for stage, recs in stages.items():
+        wall = sum(x.wall for x in recs)
+        merge = sum(x.merge_wall for x in recs)
+        mem = [x.mem_peak for x in recs if x.mem_peak is not None]
+        out.append({'stage': stage,
+                    'calls': len(recs),
+                    'wall_total': wall,
+                    'wall_mean': wall / len(recs),
+                    'cpu_total': sum(x.cpu for x in recs),
+                    'init_total': sum(x.init_wall for x in recs),
+                    'merge_total': merge,
+                    'merge_frac': merge / wall if wall else 0.0,
+                    'mem_peak_max': max(mem) if mem else None,
+                    'rows_in_mean': __mean([x.rows_in for x in recs]),
+                    'cols_in_mean': __mean([x.cols_in for x in recs]),
+                    'rows_out_mean': __mean([x.rows_out for x in recs]),
+                    'cols_out_mean': __mean([x.cols_out for x in recs])})
+    out.sort(key=lambda x: x['wall_total'], reverse=True)
+    return out
+
+
+def to_json(path: str, aggregate: bool = True):
+    """
+    Writes the profile to a JSON file
+
+    :param path: output file path
+    :param aggregate: write the per-stage summary (True) or the raw records
+    """
+    with open(path, 'w') as f:
+        json.dump(summary() if aggregate else records(), f, indent=4)
+
+
+def to_csv(path: str, aggregate: bool = True):
+    """
+    Writes the profile to a CSV file
+
+    :param path: output file path
+    :param aggregate: write the per-stage summary (True) or the raw records
+    """
+    rows = summary() if aggregate else records()
+    fields = SUMMARY_FIELDS if aggregate else RECORD_FIELDS
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
@@ -12,25 +12,87 @@ Processes data from OPC instruments, and manages the data repos.
 from oproc import *
 from pint import UnitRegistry
 import os.path
-import datetime as dt
+import sys
+import logging
 import oproc.ConfigHandler as ch
 
 
-def newprint():
-    old_print = print
+# Same look as the old timestamped print; created time rounded to seconds
+LOG_FORMAT = '[\x1b[32m%(created).0f\x1b[0m] %(message)s'
+LOG_FORMAT_DEBUG = '[\x1b[32m%(created).0f\x1b[0m] %(name)s: %(message)s'
+
+
+class _DefaultHandler(logging.StreamHandler):
+    """
+    Handler the "oproc" logger has until setup_logging is called, so scripts
+    and notebooks which only import oproc still show progress. It is silent
+    once the application configures the root logger, so messages are not
+    shown twice.
+    """
+
+    def emit(self, record):
+        if not logging.getLogger().handlers:
+            super().emit(record)
+
+
+def setup_logging(level: int | str | None = None, quiet: bool = False):
+    """
+    Configures the "oproc" logger, which all the module loggers report to.
+    Entry point scripts call this first; without it, the default handler
+    added on import logs at the OPROC_LOG_LEVEL env var level, or INFO.
 
-    def __round_seconds(obj: dt.datetime) -> dt.datetime:
-        if obj.microsecond >= 500_000:
-            obj += dt.timedelta(seconds=1)
-        return dt.datetime.timestamp(obj.replace(microsecond=0))
+    :param level: log level name or number, defaults to the OPROC_LOG_LEVEL
+    env var, or INFO if that is not set
+    :param quiet: only show warnings and errors, overrides level
+    """
+    if level is None:
+        level = os.environ.get('OPROC_LOG_LEVEL', 'INFO')
+    if quiet:
+        level = logging.WARNING
+    if isinstance(level, str):
+        level = level.upper()
+    logger = logging.getLogger('oproc')
+    logger.setLevel(level)
+    for handler in list(logger.handlers):
+        if isinstance(handler, _DefaultHandler):
+            logger.removeHandler(handler)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        logger.addHandler(handler)
+    fmt = LOG_FORMAT_DEBUG if logger.level <= logging.DEBUG else LOG_FORMAT
+    for handler in logger.handlers:
+        handler.setFormatter(logging.Formatter(fmt))
+    return logger
+
+
+def newprint():
+    """
+    Legacy timestamped print; now logs at INFO level through the "oproc"
+    logger. Use logging.getLogger(__name__) in new code.
+    """
+    logger = logging.getLogger('oproc')
 
     def timestamped_print(*args, **kwargs):
-        old_print(f'[\x1b[32m{__round_seconds(dt.datetime.now())}\x1b[0m]',
-                  *args, **kwargs)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(' '.join(str(x) for x in args))
 
     return timestamped_print
 
 
+def _default_logging():
+    """Adds the default handler, unless the "oproc" logger has one"""
+    logger = logging.getLogger('oproc')
+    if logger.handlers:
+        return
+    if logger.level == logging.NOTSET:
+        logger.setLevel(os.environ.get('OPROC_LOG_LEVEL', 'INFO').upper())
+    handler = _DefaultHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logger.addHandler(handler)
+
+
+_default_logging()
+
 unit_file = os.path.join(os.path.split(os.path.abspath(__file__))[0],
                          'units.txt')
 ureg = UnitRegistry()
@@ -15,7 +15,9 @@ from oproc.ArchiveHandler.RawDataObjects.RawFile import RawFile
 from oproc.ArchiveHandler.HDF5DataObjects.H5dd import H5dd
 from oproc.ArchiveHandler.HDF5DataObjects.CampaignFile import CampaignFile
 from oproc.ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict
-from oproc import newprint
+from oproc import ConfigHandler as ch
+from oproc import setup_logging
+from oproc.ConfigHandler.RunContext import RunContext
 
 from argparse import ArgumentParser
 import pandas as pd
@@ -24,15 +26,10 @@ import datetime as dt
 import inspect
 import time
 import os
+import logging
 
 
-print('####################################################')
-print('######## Welcome to the generic data import ########')
-print('####################################################')
-print('')
-
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger('oproc.csv_import_generic')
 
 # Parsing args
 parser = ArgumentParser(description=__doc__)
@@ -40,12 +37,21 @@ parser.add_argument("-f", "--hdf5-filename", default=None,
                     help="hdf5 file to add to, will create new if needed")
 parser.add_argument("dt", metavar="DATE",
                     help="Start and end date")
+parser.add_argument("--log-level", default=None,
+                    help="log level, default from OPROC_LOG_LEVEL or INFO")
+parser.add_argument("-q", "--quiet", action="store_true",
+                    help="only show warnings and errors")
 args = parser.parse_args()
+setup_logging(args.log_level, quiet=args.quiet)
+
+log.info('####################################################')
+log.info('######## Welcome to the generic data import ########')
+log.info('####################################################')
 
 if __name__ == "__main__":
 
     # Get datetime from input strings
-    print(f'Parsed datetime: {args.dt}')
+    log.info('Parsed datetime: %s', args.dt)
     if len(args.dt.split(',')) == 1:
         dts = pd.to_datetime(args.dt, format='ISO8601')
     elif len(args.dt.split(',')) == 2:
@@ -55,11 +61,16 @@ if __name__ == "__main__":
                               format='ISO8601'))
     else:
         raise ValueError('Invalid dt input')
-    print(f'Processing datetime(s): {dts}')
+    log.info('Processing datetime(s): %s', dts)
+
+    # Get run settings from the env vars exported by main.py
+    ctx = RunContext.from_env()
+    ctx.require('default_iss', 'instrument')
+    ch.activate(ctx)
 
     # Get iss from file
-    iss_name = os.environ["DEFAULT_ISS"]
-    main_type = os.environ["WORKING_INSTRUMENT"]
+    iss_name = ctx.default_iss
+    main_type = ctx.instrument
     iss = im.get_iss_json(iss_name)
     # Infer types from import struct spec
     types = im.types_from_iss(iss)
@@ -72,8 +83,8 @@ if __name__ == "__main__":
         # Reformat iss with fn keys and get object
         iss_o = im.get_iss_obj(iss, fdf, dt)
 
-        print(f'Reading data from files {list(iss_o.dflags.keys())}')
-        with RawFile(iss_o) as rf:
+        log.info('Reading data from files %s', list(iss_o.dflags.keys()))
+        with RawFile(iss_o, ctx=ctx) as rf:
             data = rf.read()
 
         # Get instrument metadata from the metadata path specified in the conf
@@ -88,7 +99,9 @@ if __name__ == "__main__":
                 cfn = str(cfn)
             sn = im.get_instrument_sn(cfn)
             if sn:
-                md_obj = md_obj | im.read_instrument_data(sn)
+                # Data valid at the flight time, so reprocessing is
+                # repeatable; file datetimes are naive, taken as UTC
+                md_obj = md_obj | im.read_instrument_data(sn, at=dt)
             else:
                 continue
 
@@ -101,23 +114,24 @@ if __name__ == "__main__":
         i_obj = ImportObject(d.__get__())
 
         # Format into HDF5 dict for processing
-        md = MatrixDict(i_obj.__dict__() | md_obj, unit_spec="default")
+        md = MatrixDict(i_obj.__dict__() | md_obj, unit_spec="default",
+                        ctx=ctx)
         md.date_time = dt
         h5_data = h5_data + H5dd(md)
 
     if args.hdf5_filename is None:
-        print("No HDF5 file specified, quitting")
+        log.info("No HDF5 file specified, quitting")
         raise SystemExit(0)
 
-    print("Creating directory structure")
+    log.info("Creating directory structure")
     utils.make_dir_structure()
-    print("Writing data to file")
+    log.info("Writing data to file")
     h5fn = args.hdf5_filename
-    with CampaignFile(h5fn, mode='a') as h5cf:
+    with CampaignFile(h5fn, mode='a', ctx=ctx) as h5cf:
         try:
             h5cf.write(h5_data)
         except FileExistsError:
-            print("Cannot overwrite group")
+            log.error("Cannot overwrite group")
             raise SystemExit(1)
 
     #breakpoint()
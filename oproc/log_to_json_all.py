@@ -1,35 +1,146 @@
 """
-Converts all the flight logs to json databases for quick searching
+Converts all the flight logs to json databases, or columnar h5 files, for
+quick searching. Logs are converted in parallel; converted logs are recorded
+in a manifest in the output directory, keyed by path, size and modification
+time, so a rerun only converts new or changed logs.
 """
 
 import os
+import json
+import logging
 from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from oproc import ConfigHandler as ch
+from oproc import setup_logging
 from oproc.ArchiveHandler import Utilities as utils
 from oproc.ArchiveHandler import MavLib as MavLib
 
 
-base = ch.getval('base_data_path')
-parser = ArgumentParser(description=__doc__)
-parser.add_argument("-d", "--in-directory", default='FC', metavar="LOG DIR")
-parser.add_argument("-od", "--out-directory", default='FC Proc',
-                    metavar="JSON DIR")
-args = parser.parse_args()
+log = logging.getLogger('oproc.log_to_json_all')
 
-in_dir = utils.get_log_path(None, args.in_directory)
-out_dir = utils.get_log_path(None, args.out_directory)
+MANIFEST = '.oproc_manifest.json'
+CONVERTERS = {'json': MavLib.log_to_json, 'h5': MavLib.log_to_columns}
+
+
+def load_manifest(out_dir: str) -> dict:
+    """Reads the manifest in out_dir, empty if there is none"""
+    try:
+        with open(os.path.join(out_dir, MANIFEST), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except json.JSONDecodeError:
+        log.warning('Manifest in %s is corrupt, converting all logs', out_dir)
+        return {}
+
+
+def save_manifest(out_dir: str, manifest: dict):
+    """Writes the manifest in out_dir atomically"""
+    with utils.atomic_output(os.path.join(out_dir, MANIFEST)) as tmp:
+        with open(tmp, 'w') as f:
+            json.dump(manifest, f, indent=4)
+
+
+def manifest_entry(path: str, fmt: str, messages: dict | None) -> dict:
+    """What the manifest records for a log; a changed entry is converted"""
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'format': fmt,
+            'messages': messages}
+
+
+def is_converted(manifest: dict, path: str, entry: dict,
+                 out_dir: str) -> bool:
+    """True if path was converted with the same settings and still exists"""
+    try:
+        done = manifest[path]
+    except KeyError:
+        return False
+    outs = done.get('out', [])
+    return dict([(k, done.get(k)) for k in entry]) == entry and bool(outs) \
+        and all(os.path.exists(os.path.join(out_dir, x)) for x in outs)
+
+
+def convert(path: str, fmt: str, in_dir: str, out_dir: str,
+            messages: dict | None) -> list[str]:
+    """Worker; converts one log and returns the output file names"""
+    out = CONVERTERS[fmt](path, in_dir=in_dir, out_dir=out_dir,
+                          messages=messages)
+    return [os.path.split(x)[-1] for x in out]
 
-if not os.path.exists(out_dir):
-    print('Creating data directory structure at base path %s' % base)
-    utils.make_dir_structure()
 
 if __name__ == '__main__':
-    log_files = os.listdir(in_dir)
-    file_df = utils.match_raw_files([args.in_directory, args.out_directory],
-                                    files=log_files, tol_min=1)
-    proc_list = file_df.isna()[args.in_directory]
-    [file_df.isna()[args.out_directory] is True].values.tolist()
-    if not proc_list:
-        raise FileNotFoundError('All .log files are processed')
-    for f in proc_list:
-        MavLib.log_to_json(f)
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument("-d", "--in-directory", default='FC',
+                        metavar="LOG DIR")
+    parser.add_argument("-od", "--out-directory", default='FC Proc',
+                        metavar="JSON DIR")
+    parser.add_argument("-F", "--format", default="json",
+                        choices=list(CONVERTERS),
+                        help="output format; h5 is columnar and streamed")
+    parser.add_argument("-i", "--iss", action="append", default=None,
+                        metavar="ISS",
+                        help="only convert the FC messages and fields used "
+                             "by this iss file (repeatable)")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+                        help="number of conversion processes, default is "
+                             "the number of CPUs")
+    parser.add_argument("--force", action="store_true",
+                        help="convert all logs, ignoring the manifest")
+    parser.add_argument("--log-level", default=None,
+                        help="log level, default from OPROC_LOG_LEVEL or INFO")
+    parser.add_argument("-q", "--quiet", action="store_true",
+                        help="only show warnings and errors")
+    args = parser.parse_args()
+    setup_logging(args.log_level, quiet=args.quiet)
+
+    base = ch.getval('base_data_path')
+    in_dir = utils.get_log_path(None, args.in_directory)
+    try:
+        out_dir = utils.get_log_path(None, args.out_directory)
+    except FileNotFoundError:
+        log.info('Creating data directory structure at base path %s', base)
+        utils.make_dir_structure()
+        out_dir = utils.get_log_path(None, args.out_directory)
+
+    messages = MavLib.messages_from_iss(args.iss) if args.iss else None
+    manifest = {} if args.force else load_manifest(out_dir)
+
+    # Work out which logs are new or changed since they were converted
+    todo = {}
+    for fn in utils.list_dir(in_dir):
+        path = os.path.join(in_dir, fn)
+        if os.path.splitext(fn)[-1] != '.log' or not os.path.isfile(path):
+            continue
+        entry = manifest_entry(path, args.format, messages)
+        if is_converted(manifest, path, entry, out_dir):
+            log.debug('%s already converted, skipping', fn)
+        else:
+            todo[path] = entry
+    if not todo:
+        log.info('All .log files are processed')
+        raise SystemExit(0)
+    log.info('Converting %i log(s) with %i worker(s)', len(todo),
+             args.workers)
+
+    # Manifest is only written by this process, as each conversion finishes
+    failed = []
+    with ProcessPoolExecutor(max_workers=max(1, args.workers),
+                             initializer=setup_logging,
+                             initargs=(args.log_level, args.quiet)) as ex:
+        futures = dict([(ex.submit(convert, path, args.format,
+                                   args.in_directory, args.out_directory,
+                                   messages), path) for path in todo])
+        for fut in as_completed(futures):
+            path = futures[fut]
+            try:
+                outs = fut.result()
+            except Exception:
+                log.exception('Failed to convert %s', path)
+                failed.append(path)
+                continue
+            manifest[path] = todo[path] | {'out': outs}
+            save_manifest(out_dir, manifest)
+
+    if failed:
+        log.error('%i log(s) failed: %s', len(failed), failed)
+        raise SystemExit(1)
@@ -1,5 +1,6 @@
 import click
 import io
+import logging
 import time
 import sys
 import os
@@ -10,10 +11,14 @@ from tabulate import tabulate
 
 import oproc
 import oproc.ConfigHandler as ch
+from oproc.ConfigHandler.RunContext import RunContext
 from oproc.ArchiveHandler.HDF5DataObjects.CampaignFile import CampaignFile
 from oproc.ArchiveHandler.HDF5DataObjects.H5dd import H5dd
 #from oproc.ArchiveHandler import ImportLib as im
 from oproc.ArchiveHandler import Utilities as utils
+from oproc.ArchiveHandler import CacheLib
+from oproc.ProcHandler import ProcLib as pl
+from oproc.ProcHandler import ProcProfile as pp
 from oproc.ProcHandler.ProcObjects.CalibrateOPC import CalibrateOPC
 from oproc.ProcHandler.ProcObjects.NConc import NConc
 from oproc.ProcHandler.ProcObjects.MConc import MConc
@@ -29,45 +34,23 @@ from oproc.ProcHandler.ProcObjects.EffectiveRadius import EffectiveRadius
 from oproc.ProcHandler.ProcObjects.AOAMask import AOAMask
 from oproc.ProcHandler.ProcObjects.GetPeriod import GetPeriod
 from oproc.ProcHandler.ProcObjects.AirspeedCorrection import AirspeedCorrection
-from oproc import newprint
 from oproc.PlotHandler.PlotObjects.LinePlot2D import LinePlot2D
 from oproc.PlotHandler.PlotObjects.OSMTracePlot import OSMTracePlot
 from oproc.PlotHandler.PlotObjects.PlotSpec import PlotSpec
 
-# Redefining print function with timestamp
-print = newprint()
+log = logging.getLogger(__name__)
 
-# Setup EnvVars (will be set in GUI or profile or something)
-instrument="UCASS"
-if instrument=="UCASS":
-    os.environ["WORKING_INSTRUMENT"] = "UCASS"
-    os.environ["AIRSPEED_TYPE"] = "normal"
-    os.environ["WORKING_MATERIAL"] = "water"
-    os.environ["DEFAULT_ISS"] = "pace2022_sht_iss.json"
-    os.environ["MATERIAL_ISS"] = "ucass_scs_iss.json"
-    os.environ["WIND_ISS"] = "sammal_wd_iss.json"
-    os.environ["SV_TYPE"] = "Airspeed"
-elif instrument=="CDP":
-    os.environ["SV_TYPE"] = "Airspeed"
-    os.environ["WORKING_INSTRUMENT"] = "CDP"
-    os.environ["WORKING_MATERIAL"] = "water"
-    os.environ["DEFAULT_ISS"] = "cdp_ql_iss.json"
-    os.environ["MATERIAL_ISS"] = "cdp_ql_scs_iss.json"
-elif instrument=="FFSSP":
-    os.environ["SV_TYPE"] = "Airspeed"
-    os.environ["WORKING_INSTRUMENT"] = "FFSSP"
-    os.environ["WORKING_MATERIAL"] = "water"
-    os.environ["DEFAULT_ISS"] = "ffssp_ql_iss.json"
-    os.environ["MATERIAL_ISS"] = "ffssp_ql_scs_iss.json"
-elif instrument=="PCASP":
-    os.environ["SV_TYPE"] = "FlowRate"
-    os.environ["WORKING_INSTRUMENT"] = "PCASP"
-    os.environ["WORKING_MATERIAL"] = "water"
-    os.environ["DEFAULT_ISS"] = "pcasp_ql_iss.json"
-    os.environ["MATERIAL_ISS"] = "pcasp_ql_scs_iss.json"
-else:
-    raise RuntimeError
-os.environ["PLOT_STYLE"] = "CopernicusStyle"
+# Setup run context (will be set in GUI or profile or something); the env
+# vars are still exported for the import subprocess
+instrument = "UCASS"
+ctx = RunContext.for_instrument(instrument)
+ch.activate(ctx)
+os.environ.update(ctx.to_env())
+
+# Processing chain run by pdport (and timed by profile)
+PDPORT_CHAIN = [CalibrateOPC, AddWindDat, AirspeedCorrection, SampleVolume,
+                NConc, ProfileSplit, AOAMask, AirspeedMask, AddMaterial,
+                BinCentres, BinRadii, MConc, EffectiveRadius]
 
 def run_subprocess(args):
     filename = ch.getval("log_path")
@@ -85,7 +68,16 @@ def run_subprocess(args):
     return process
 
 @click.group()
-def cli():
+@click.option('-q', '--quiet', is_flag=True,
+              help='Only show warnings and errors')
+@click.option('--log-level', default=None,
+              type=click.Choice(['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                                case_sensitive=False),
+              help='Log level, default from OPROC_LOG_LEVEL or INFO')
+def cli(quiet, log_level):
+    logger = oproc.setup_logging(log_level, quiet=quiet)
+    # Pass the level on to the import subprocesses
+    os.environ['OPROC_LOG_LEVEL'] = logging.getLevelName(logger.level)
     return
 
 @cli.command()
@@ -100,7 +92,7 @@ def list(match_type):
 #            ['UCASS','Met','SHT','FC Proc','CDP','PCASP'],
             ['UCASS','Met','FC Proc'],
                                      default_type=match_type)
-    print('\n'+tabulate(list, headers='keys', tablefmt='psql'))
+    click.echo(tabulate(list, headers='keys', tablefmt='psql'))
 
 @cli.command()
 @click.argument('dts')
@@ -115,7 +107,7 @@ def rdport(h5_file, dts):
 @click.option('--save/--no-save', default=False)
 def soc_ql(h5_path: str, save: bool):
     phs = {}
-    with CampaignFile(h5_path) as cf:
+    with CampaignFile(h5_path, ctx=ctx) as cf:
         dd = cf.read()
         md_list = dd.md
         ps = PlotSpec(1, 1, [np.matrix(['Time', 'mass_conc'])],
@@ -137,7 +129,7 @@ def soc_ql(h5_path: str, save: bool):
 @cli.command()
 @click.argument('h5-path')
 def soc_ql_proc(h5_path):
-    with CampaignFile(h5_path) as cf:
+    with CampaignFile(h5_path, ctx=ctx) as cf:
         dd = cf.read()
         md_list = dd.md
     h5 = H5dd(None)
@@ -175,8 +167,8 @@ def soc_ql_proc(h5_path):
 
         h5 = h5 + H5dd(do)
 
-    with CampaignFile(h5_path, mode="w") as cf:
-        print(md_list)
+    with CampaignFile(h5_path, mode="w", ctx=ctx) as cf:
+        log.info('Writing %s', md_list)
         cf.write(h5)
 
 @cli.command()
@@ -185,7 +177,7 @@ def soc_ql_proc(h5_path):
 def plot(h5_path: str, save: bool):
     plot_args = {'mask': ['PMask1']}
     phs = {}
-    with CampaignFile(h5_path) as cf:
+    with CampaignFile(h5_path, ctx=ctx) as cf:
         dd = cf.read()
         md_list = dd.md
         ps = PlotSpec(1, 2, [np.matrix(['effective_radius', 'Alt']),
@@ -210,7 +202,7 @@ def plot(h5_path: str, save: bool):
 def map_plot(h5_path: str, save: bool):
     plot_args = {'Zoom': 16, 'Extent': [24.09, 24.19, 68, 68.03], 'mask':['PMask1']}
     phs = {}
-    with CampaignFile(h5_path) as cf:
+    with CampaignFile(h5_path, ctx=ctx) as cf:
         dd = cf.read()
         md_list = dd.md
         ps = PlotSpec(1, 1, [np.matrix(['Lng', 'Lat'])],
@@ -232,44 +224,66 @@ def map_plot(h5_path: str, save: bool):
 @cli.command()
 @click.argument('h5-path')
 def pdport(h5_path):
-    with CampaignFile(h5_path) as cf:
+    with CampaignFile(h5_path, ctx=ctx) as cf:
         dd = cf.read()
         md_list = dd.md
     h5 = H5dd(None)
     for md in md_list:
-        cobj = CalibrateOPC(md)
-        do = cobj.proc()
-        wdobj = AddWindDat(do)
-        do = wdobj.proc()
-        ascobj = AirspeedCorrection(do)
-        do = ascobj.proc()
-        svobj = SampleVolume(do)
-        do = svobj.proc()
-        ncobj = NConc(do)
-        do = ncobj.proc()
-        psobj = ProfileSplit(do)
-        do = psobj.proc()
-        aoaobj = AOAMask(do)
-        do = aoaobj.proc()
-        vzobj = AirspeedMask(do)
-        do = vzobj.proc()
-        matobj = AddMaterial(do)
-        do = matobj.proc()
-        bcsobj = BinCentres(do)
-        do = bcsobj.proc()
-        brobj = BinRadii(do)
-        do = brobj.proc()
-        mcobj = MConc(do)
-        do = mcobj.proc()
-        erobj = EffectiveRadius(do)
-        do = erobj.proc()
-
+        do = pl.run_chain(md, PDPORT_CHAIN)
         h5 = h5 + H5dd(do)
 
-    with CampaignFile(h5_path, mode="w") as cf:
-        print(md_list)
+    with CampaignFile(h5_path, mode="w", ctx=ctx) as cf:
+        log.info('Writing %s', md_list)
         cf.write(h5)
 
+@cli.command()
+@click.argument('h5-path')
+@click.option('--json', 'json_path', default=None,
+              help='Also write the per-stage summary to this JSON file')
+@click.option('--csv', 'csv_path', default=None,
+              help='Also write the per-stage summary to this CSV file')
+@click.option('--raw/--summary', default=False,
+              help='Export every stage record instead of the summary')
+@click.option('--memory/--no-memory', default=True,
+              help='Trace peak memory per stage (slower)')
+def profile(h5_path, json_path, csv_path, raw, memory):
+    """Runs the pdport chain without writing and ranks the stages by time"""
+    with CampaignFile(h5_path, ctx=ctx) as cf:
+        dd = cf.read()
+        md_list = dd.md
+    pp.reset()
+    pp.enable(trace_memory=memory)
+    try:
+        for md in md_list:
+            pl.run_chain(md, PDPORT_CHAIN)
+    finally:
+        pp.disable()
+    click.echo(tabulate(pp.summary(), headers='keys', tablefmt='psql',
+                        floatfmt='.4g'))
+    if json_path:
+        pp.to_json(json_path, aggregate=not raw)
+    if csv_path:
+        pp.to_csv(csv_path, aggregate=not raw)
+
+@cli.group()
+def cache():
+    """Parsed raw file cache"""
+    return
+
+@cache.command()
+def stats():
+    """Shows the size of the parsed raw file cache"""
+    st = CacheLib.stats()
+    click.echo(tabulate([[k, v] for k, v in st.items()
+                         if k in ['path', 'entries', 'size_mb', 'limit_mb']],
+                        tablefmt='psql', floatfmt='.1f'))
+
+@cache.command()
+def clear():
+    """Removes all the parsed raw file cache entries"""
+    n = CacheLib.clear()
+    click.echo(f'Removed {n} cache entries')
+
 @cli.command()
 @click.argument('iss')
 def isswrite(iss):
@@ -1,6 +1,8 @@
 from oproc import ConfigHandler as ch
+from oproc import setup_logging
 
 import json
+import logging
 from argparse import ArgumentParser
 
 
@@ -8,6 +10,8 @@ parser = ArgumentParser(description=__doc__)
 parser.add_argument("ssp", default=None,
                     help="path to the import struct spec json")
 args = parser.parse_args()
+setup_logging()
+log = logging.getLogger('oproc.write_iss')
 
 ssp = args.ssp
 with open(ssp, 'r') as ssp:
@@ -21,7 +25,7 @@ try:
                    "desc": "flags for data headers, read "
                            "\"valid_flags\" config entry for details"
                    })
-    print("Written iss to config:")
+    log.info("Written iss to config:")
     ch.getconf("data_flags")
 except FileExistsError:
     ch.change_config_val("data_flags", iss)
@@ -4,7 +4,7 @@ setup(
     install_requires=[
         'pint',
         'h5py',
-        'pandas',
+        'pandas>=2.0',
         'numpy',
         'scipy',
         'matplotlib',
@@ -0,0 +1,32 @@
+"""
+oproc reads its config on import, so a minimal config is written to a temp
+directory, and pointed to with OPROC_CONFIG, before any test imports oproc.
+"""
+
+import json
+import os
+import tempfile
+
+
+BASE = tempfile.mkdtemp(prefix='oproc_test_')
+
+FLAGS = [{'name': 'Time', 'unit': 's', 'desc': 'time'},
+         {'name': 'date_time', 'unit': 'none', 'desc': 'start datetime'},
+         {'name': 'C#', 'unit': 'none', 'desc': 'bin counts'},
+         {'name': 'Alt', 'unit': 'm', 'desc': 'altitude'},
+         {'name': 'Press', 'unit': 'Pa', 'desc': 'pressure'}]
+
+
+def _conf(name, val, dtype):
+    return {'name': name, 'val': val, 'dtype': dtype, 'unit': 'none',
+            'desc': name}
+
+
+CONFIG = [_conf('tag_suffix', '#', 'str'),
+          _conf('valid_flags', FLAGS, 'list'),
+          _conf('base_data_path', BASE, 'str'),
+          _conf('raw_cache_size_mb', 16, 'int')]
+
+with open(os.path.join(BASE, 'OPROCConfig.json'), 'w') as f:
+    json.dump(CONFIG, f)
+os.environ['OPROC_CONFIG'] = os.path.join(BASE, 'OPROCConfig.json')
@@ -0,0 +1,210 @@
+"""
+The vectorised paths against the code they replaced, or against the slow
+path still kept for the cases they do not cover.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from oproc.ArchiveHandler import CacheLib as cl
+from oproc.ArchiveHandler import ImportLib as im
+from oproc.ArchiveHandler import Utilities as utils
+from oproc.ArchiveHandler.GenericDataObjects.MatrixDict import MatrixDict
+from oproc.ProcHandler.ProcObjects.BinRadii import interp_linear, \
+    interp_merge
+
+from conftest import BASE
+
+
+T0 = pd.Timestamp('2022-03-04 10:00:00')
+
+
+def make_md(seconds, **cols) -> MatrixDict:
+    Time = pd.DatetimeIndex(T0 + pd.to_timedelta(seconds, unit='s'),
+                            name='Time')
+    dd = dict([(k, np.matrix(v).T) for k, v in cols.items()])
+    return MatrixDict(dd | {'Time': Time, 'date_time': T0},
+                      unit_spec='default')
+
+
+def assert_md_equal(md, dd):
+    np.testing.assert_array_equal(md.Time.to_numpy(),
+                                  pd.DatetimeIndex(dd['Time']).to_numpy())
+    assert set(md.col_dict) == set(dd) - {'Time'}
+    for k, v in md.col_dict.items():
+        got = np.asarray(v.__get__(), dtype=float).ravel()
+        np.testing.assert_array_equal(got, np.asarray(dd[k],
+                                                      dtype=float).ravel())
+
+
+@pytest.mark.parametrize('sa, sb', [
+    ([0, 1, 2, 3], [0, 1, 2, 3]),
+    ([0, 1, 2, 3], [2, 3, 4, 5, 6]),
+    ([0, 2, 4], [1, 3, 5]),
+    ([3, 1, 2], [2, 0])])
+def test_matrixdict_add(sa, sb):
+    rng = np.random.default_rng(len(sa) + len(sb))
+    a = make_md(sa, Alt=rng.normal(size=len(sa)),
+                C1=rng.integers(0, 9, len(sa)))
+    b = make_md(sb, Alt=rng.normal(size=len(sb)),
+                Press=rng.normal(size=len(sb)),
+                C2=rng.integers(0, 9, len(sb)))
+    assert_md_equal(a + b, a._MatrixDict__sync2(b))
+
+
+def make_frame(rng, seconds, hz, cols, start=T0) -> pd.DataFrame:
+    n = int(seconds * hz)
+    t = start + pd.to_timedelta(np.sort(rng.uniform(0, seconds, n)),
+                                unit='s')
+    df = pd.DataFrame(dict([(c, rng.normal(size=n)) for c in cols]),
+                      index=pd.DatetimeIndex(t, name='timestamp'))
+    return df[~df.index.duplicated()]
+
+
+@pytest.mark.parametrize('keep_one', [False, True])
+@pytest.mark.parametrize('agg', [None, {'Status': 'sum', 'Roll': 'last'}])
+def test_sync_and_resample(keep_one, agg):
+    rng = np.random.default_rng(0)
+    att = make_frame(rng, 30, 10, ['Roll', 'Pitch'])
+    att.iloc[[0, 5, -1]] = np.nan
+    gps = make_frame(rng, 30, 5, ['Lat', 'Alt'])
+    gps = gps[(gps.index < T0 + pd.Timedelta(seconds=10)) |
+              (gps.index > T0 + pd.Timedelta(seconds=15))]
+    baro = make_frame(rng, 30, 8, ['Alt', 'Empty'])
+    baro['Empty'] = np.nan
+    ekf = make_frame(rng, 26, 3, ['Status'],
+                     start=T0 + pd.Timedelta(seconds=2))
+    ekf['Status'] = rng.integers(0, 4, len(ekf))
+    frames = [att, gps, baro, ekf]
+    assert im._no_bins(frames, pd.tseries.frequencies.to_offset('0.1S')) \
+        is None
+
+    new = im.sync_and_resample(frames, '0.1S', keep_one=keep_one, agg=agg)
+    old = im._sync_merge(frames, '0.1S', keep_one, agg or {})
+    pd.testing.assert_frame_equal(new, old, check_exact=False, rtol=1e-12)
+
+
+FN = '/data/Raw/UCASS/UCASS_20220304_100000000_1.csv'
+
+
+@pytest.mark.parametrize('dts', [
+    ['2022-03-04 10:00:01.5', '2022-03-04 10:00:02.25',
+     '2022-03-04 10:00:03'],
+    ['03/04/2022 10:00:01', '03/04/2022 10:00:02', '03/04/2022 10:00:03'],
+    ['04/03/2022 10:00:01', '04/03/2022 10:00:02', '05/03/2022 00:00:03'],
+    ['2022-03-04 10:00:01 5', '2022-03-04 10:00:02 25']])
+@pytest.mark.parametrize('tz', [None, 2])
+def test_infer_datetime_series(dts, tz):
+    s = pd.Series(dts, index=np.arange(len(dts)) + 10)
+    new = im.infer_datetime_series(FN, s, tz)
+    old = pd.to_datetime([im.infer_datetime(FN, x, tz) for x in dts])
+    assert new.index.equals(s.index)
+    np.testing.assert_array_equal(new.to_numpy(dtype='datetime64[ns]'),
+                                  old.to_numpy(dtype='datetime64[ns]'))
+
+
+def _join_rows(cols):
+    """The old join: rows of the concatenated matrix, joined by spaces"""
+    rows = np.concatenate([np.matrix(np.asarray(x)).T for x in cols],
+                          axis=1).tolist()
+    return [' '.join(str(x) for x in row) for row in rows]
+
+
+@pytest.mark.parametrize('cols', [
+    [pd.Series(['2022-03-04', '2022-03-05']),
+     pd.Series(['10:00:01', '10:00:02'])],
+    [pd.Series([20220304, 20220305]), pd.Series([100001, 100002])],
+    [pd.Series([20220304, 20220305]), pd.Series([100001.5, 100002.0])],
+    [pd.Series([20220304, 20220305])]])
+def test_join_columns(cols):
+    assert im.join_columns(cols).to_list() == _join_rows(cols)
+
+
+def _argmin_match(dts, table, tol_min):
+    """The old per datetime argmin match"""
+    fdt = table['datetime'].to_numpy()
+    out = []
+    for dt0 in dts:
+        delta = np.abs((fdt - np.datetime64(dt0)) / np.timedelta64(1, 'm'))
+        i = int(np.argmin(delta))
+        out.append(np.nan if delta[i] > tol_min else table['fn'].iloc[i])
+    return out
+
+
+def test_match_nearest():
+    rng = np.random.default_rng(1)
+    fdt = T0 + pd.to_timedelta([0, 10, 10, 20, 45, 46], unit='min')
+    table = pd.DataFrame({'datetime': fdt,
+                          'fn': [f'f{i}' for i in range(len(fdt))]})
+    dts = T0 + pd.to_timedelta(np.concatenate([
+        rng.uniform(-10, 60, 50), [5, 15, 30, 45.5, -6, 52]]), unit='min')
+    new = utils.match_nearest(dts, table, 6)
+    old = _argmin_match(dts, table, 6)
+    assert [x if isinstance(x, str) else None for x in new] == \
+        [x if isinstance(x, str) else None for x in old]
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    path = tmp_path / 'UCASS_20220304_100000000_1.csv'
+    path.write_text('Time,Alt\n')
+    return str(path)
+
+
+def test_cache_round_trip(raw_file):
+    data = {'Alt': np.matrix([1.5, np.nan, 3.0]).T,
+            'C1': np.array([1, 2, 3]),
+            'Time': pd.DatetimeIndex(T0 + pd.to_timedelta([0, 1, 2],
+                                                          unit='s'),
+                                     name='Time'),
+            'serial': ['a', 'b']}
+    units = {'Alt': 'm'}
+    key = cl.make_key(raw_file, {'type': 'UCASS'}, window=None)
+    assert cl.put(key, data, units)
+    got, got_units = cl.get(key)
+    assert got_units == units
+    assert list(got) == list(data)
+    assert isinstance(got['Alt'], np.matrix)
+    np.testing.assert_array_equal(got['Alt'], data['Alt'])
+    np.testing.assert_array_equal(got['C1'], data['C1'])
+    assert got['Time'].equals(data['Time'])
+    assert got['Time'].name == 'Time'
+    assert got['serial'] == data['serial']
+
+
+def test_cache_key_changes_with_file(raw_file):
+    key = cl.make_key(raw_file, {'type': 'UCASS'})
+    with open(raw_file, 'a') as f:
+        f.write('1,2\n')
+    assert cl.make_key(raw_file, {'type': 'UCASS'}) != key
+    assert cl.make_key(raw_file, {'type': 'UCASS'}, window=(1, 2)) != \
+        cl.make_key(raw_file, {'type': 'UCASS'})
+
+
+def test_cache_corrupt_entry(raw_file):
+    key = cl.make_key(raw_file, {'type': 'UCASS'}, corrupt=True)
+    path = os.path.join(cl.cache_dir(), key + '.npz')
+    assert path.startswith(BASE)
+    with open(path, 'wb') as f:
+        f.write(b'not a zip')
+    assert cl.get(key) is None
+    assert not os.path.exists(path)
+
+
+@pytest.mark.parametrize('repeat', [False, True])
+def test_interp_merge(repeat):
+    rng = np.random.default_rng(2)
+    rad = np.linspace(0.1, 20, 200)
+    scs = rad ** 2 * (1 + 0.3 * np.sin(rad))
+    q = np.concatenate([rng.uniform(scs.min() / 2, scs.max() * 2, 40),
+                        scs[[0, 50, -1]]])
+    if repeat:
+        q = np.concatenate([q, q[:3]])
+    new = interp_merge(q, scs, rad)
+    old = interp_linear(pd.DataFrame({'mat_scs': q}),
+                        pd.DataFrame({'mat_rad': rad, 'mat_scs': scs}),
+                        'mat_scs', 'mat_rad')
+    np.testing.assert_allclose(new, old, rtol=1e-12, equal_nan=True)
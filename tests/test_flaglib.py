@@ -0,0 +1,20 @@
+from oproc import ConfigHandler as ch
+from oproc.ArchiveHandler import FlagLib as fl
+
+
+def test_get_index_is_cached():
+    assert fl.get_index() is fl.get_index()
+
+
+def test_getval_copy_does_not_change_index():
+    vf = ch.getval('valid_flags')
+    vf.append({'name': 'Extra', 'unit': 'none', 'desc': 'extra'})
+    fi = fl.get_index()
+    assert 'Extra' not in fi
+    assert fi is fl.get_index()
+
+
+def test_lookup_numbered_tag():
+    fi = fl.get_index()
+    assert fi.template('C12') == 'C#'
+    assert fi.lookup('C12')['unit'] == 'none'